@@ -0,0 +1,104 @@
+from collections import namedtuple
+from multiprocessing import Pool, shared_memory
+import logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+from cell_grid import CellGrid
+import solver as slvr
+
+# Result of one query, path is a list of (x, y) from start to end if paths were requested
+# Cost and length are None if end can't be reached
+QueryResult = namedtuple('QueryResult', ['index', 'start', 'end', 'cost', 'length', 'path'])
+
+# Worker process state, set up once per worker by _init_worker
+_worker = {}
+
+
+def _init_worker(shm_name, width, height, solver_name, with_paths, with_terrain):
+    # Solvers log every found path
+    logging.getLogger(slvr.__name__).setLevel(logging.WARNING)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # Read only views, workers can't change cell types or terrain costs by accident
+    n = width * height
+    buf = shm.buf.toreadonly()
+    grid = CellGrid(width, 1, buf[:n], (0, 0), (0, 0), buf[n:2 * n] if with_terrain else None, height)
+    _worker['shm'] = shm
+    _worker['grid'] = grid
+    _worker['solver'] = slvr.SOLVERS[solver_name](solver_name, grid)
+    _worker['with_paths'] = with_paths
+
+
+# Solve one query in worker
+# Start and end are set on the grid without writing their cell types, other
+# workers share the same type array.
+def _solve(query):
+    index, (s_x, s_y), (e_x, e_y) = query
+    grid = _worker['grid']
+    solver = _worker['solver']
+    grid.start_cell = grid.get_cell(s_x, s_y)
+    grid.end_cell = grid.get_cell(e_x, e_y)
+    solver.reset(grid)
+    solver.solve_all()
+    if not solver.solved:
+        return QueryResult(index, (s_x, s_y), (e_x, e_y), None, None, None)
+    cells = solver.get_path()
+    cells.reverse()
+    cost = 0.0
+    costs = grid._costs
+    for c1, c2 in zip(cells, cells[1:]):
+        move = slvr.DIAG_COST if c1.x != c2.x and c1.y != c2.y else 1.0
+        cost += move if costs is None else move * (costs[c1._idx] + costs[c2._idx]) * 0.5
+    path = [(c.x, c.y) for c in cells] if _worker['with_paths'] else None
+    return QueryResult(index, (s_x, s_y), (e_x, e_y), cost, len(cells), path)
+
+
+# Answers batches of (start, end) queries on one grid with a pool of worker processes
+# Cell types and terrain costs are copied to shared memory once and every worker maps the same block,
+# so queries only send coordinates to workers. Workers keep their own solver and
+# search arrays between queries. Astar, Dijkstra and the Dial solvers then clear only
+# the cells the previous query touched, so short queries on a large map stay cheap,
+# other path finders reset the whole grid per query. Grid changes after creating the
+# engine are not seen by workers, create a new engine for a changed grid.
+#
+#   with BatchQueryEngine(grid, 'Astar') as engine:
+#       for res in engine.query([((1, 1), (50, 60)), ((3, 7), (20, 2))]):
+#           print(res.index, res.cost)
+class BatchQueryEngine:
+    def __init__(self, grid: CellGrid, solver_name='Astar', processes=None, with_paths=False):
+        if solver_name not in slvr.PATHFINDERS:
+            raise ValueError("Unknown pathfinder %s" % solver_name)
+        n = grid.width * grid.height
+        with_terrain = grid.has_terrain
+        self.__shm = shared_memory.SharedMemory(create=True, size=2 * n if with_terrain else n)
+        self.__shm.buf[:n] = bytes(grid._types)
+        if with_terrain:
+            self.__shm.buf[n:2 * n] = bytes(grid._costs)
+        self.__pool = Pool(processes, _init_worker, (self.__shm.name, grid.width, grid.height, solver_name, with_paths, with_terrain))
+        logger.debug("Started batch query engine for %s with grid size %dx%d", solver_name, grid.width, grid.height)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Yields QueryResult for each (start, end) query in order of completion
+    # Queries are sent to workers in chunks of chunksize
+    def query(self, queries, chunksize=64):
+        jobs = ((i, tuple(start), tuple(end)) for i, (start, end) in enumerate(queries))
+        yield from self.__pool.imap_unordered(_solve, jobs, chunksize)
+
+    # Results of all queries ordered like queries
+    def query_all(self, queries, chunksize=64):
+        res = list(self.query(queries, chunksize))
+        res.sort(key=lambda r: r.index)
+        return res
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+            self.__shm.close()
+            self.__shm.unlink()
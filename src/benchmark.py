@@ -0,0 +1,242 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+from cell_grid import CellGrid, CellType
+import solver as slvr
+
+DEFAULT_SIZES = [64, 128, 256]
+ALL_SIZES = [64, 128, 256, 512, 1024, 2048, 4096]
+
+# Elapsed time is checked every TIME_CHECK_STEPS steps
+TIME_CHECK_STEPS = 1024
+
+# Timing modes, auto runs solve_all of solvers that have their own and steps otherwise
+MODES = ['auto', 'steps']
+
+# Results with wall time this much over the compared run are reported as regressions
+DEFAULT_THRESHOLD = 0.2
+
+
+# Run solver to the end or until time limit
+# Returns (steps, finished)
+def run_steps(solver, time_limit):
+    steps = 0
+    t_start = time.perf_counter()
+    t_end = t_start + time_limit if time_limit else None
+    finished = True
+    while not solver.solved and not solver.no_path:
+        solver.solve_step()
+        steps += 1
+        if t_end and steps % TIME_CHECK_STEPS == 0 and time.perf_counter() > t_end:
+            finished = False
+            break
+    solver.stats.add_steps(steps, time.perf_counter() - t_start)
+    return steps, finished
+
+
+# Event like stop request for solve_all, set once time limit has passed
+class Deadline:
+    def __init__(self, seconds):
+        self.__end = time.perf_counter() + seconds
+
+    def is_set(self):
+        return time.perf_counter() > self.__end
+
+
+# Run solve_all of solver, steps are the ones solver counted itself,
+# 0 for bulk generators that don't take steps
+# Returns (steps, finished)
+def run_solve_all(solver, time_limit):
+    solver.stop_event = Deadline(time_limit) if time_limit else None
+    solver.solve_all()
+    solver.stop_event = None
+    return solver.stats.steps, solver.solved or solver.no_path
+
+
+def has_solve_all(solver):
+    return type(solver).solve_all is not slvr.Solver.solve_all
+
+
+def run_solver(solver, time_limit, mode):
+    if mode == 'solve_all':
+        return run_solve_all(solver, time_limit)
+    return run_steps(solver, time_limit)
+
+
+# Run solver once for timing and once more under tracemalloc for peak memory,
+# tracing slows python code down too much to time both in the same run.
+# Grid is copied for both runs so generators start from the same map.
+# Mode of the run is recorded in result, solve_all or steps.
+def measure(solver_name, grid, time_limit, memory, mode='auto'):
+    res = {}
+    work = grid.copy()
+    solver = slvr.SOLVERS[solver_name](solver_name, work)
+    if mode == 'auto':
+        mode = 'solve_all' if has_solve_all(solver) else 'steps'
+    t0 = time.perf_counter()
+    solver.reset(work)
+    steps, finished = run_solver(solver, time_limit, mode)
+    wall = time.perf_counter() - t0
+
+    res['mode'] = mode
+    res['wall_time'] = wall
+    res['steps'] = steps
+    res['steps_per_second'] = steps / wall if steps and wall > 0 else None
+    res['timed_out'] = not finished
+    res['solved'] = solver.solved
+    res['no_path'] = solver.no_path
+    res['peak_memory'] = None
+    res['stats'] = solver.get_stats().as_dict()
+
+    if memory and finished:
+        mem_grid = grid.copy()
+        tracemalloc.start()
+        mem_solver = slvr.SOLVERS[solver_name](solver_name, mem_grid)
+        mem_solver.reset(mem_grid)
+        run_solver(mem_solver, None, mode)
+        res['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return res, solver, work
+
+
+# Same start and end placement as the application uses for pathfinders
+def place_endpoints(grid):
+    c1 = grid.find_free_cell(1)
+    c2 = grid.find_free_cell(-1)
+    if c1 is None or c2 is None:
+        return False
+    grid.set_cell_type(c1.x, c1.y, CellType.START)
+    grid.set_cell_type(c2.x, c2.y, CellType.END)
+    return True
+
+
+def path_cost(path):
+    res = 0.0
+    for c1, c2 in zip(path, path[1:]):
+        res += math.hypot(c1.x - c2.x, c1.y - c2.y)
+    return res
+
+
+# Open map has only border walls
+# Mazes are generated with given seed, returns generator result and grid
+def make_maps(size, seed, generators, time_limit, memory, mode):
+    maps = [('open', CellGrid(size, 1), None)]
+    for name in generators:
+        random.seed(seed)
+        res, _, grid = measure(name, CellGrid(size, 1), time_limit, memory, mode)
+        maps.append((name, grid, res))
+    return maps
+
+
+def run_benchmark(sizes, seed, solvers, time_limit, memory, mode='auto'):
+    results = []
+    generators = [n for n in solvers if n not in slvr.PATHFINDERS]
+    pathfinders = [n for n in solvers if n in slvr.PATHFINDERS]
+    for size in sizes:
+        for map_name, grid, gen_res in make_maps(size, seed, generators, time_limit, memory, mode):
+            if gen_res is not None:
+                gen_res.update(kind='generator', solver=map_name, map=map_name, size=size, seed=seed)
+                results.append(gen_res)
+                logger.info("%-16s %-16s %5d %9.3f s %10d steps", map_name, map_name, size, gen_res['wall_time'], gen_res['steps'])
+                if gen_res['timed_out']:
+                    continue
+            if not place_endpoints(grid):
+                logger.warning("No free cell for start or end in map %s size %d", map_name, size)
+                continue
+            for name in pathfinders:
+                res, solver, _ = measure(name, grid, time_limit, memory, mode)
+                path = solver.get_path() if solver.solved else []
+                res.update(kind='pathfinder', solver=name, map=map_name, size=size, seed=seed)
+                res['nodes_expanded'] = solver.stats.expanded
+                res['path_length'] = len(path)
+                res['path_cost'] = path_cost(path)
+                results.append(res)
+                logger.info("%-16s %-16s %5d %9.3f s %10d steps", name, map_name, size, res['wall_time'], res['steps'])
+    return results
+
+
+# Results of earlier files without mode were timed in steps
+def result_key(res):
+    return (res['kind'], res['solver'], res.get('mode', 'steps'), res['map'], res['size'], res['seed'])
+
+
+# Compare wall times against earlier results file
+# Returns list of (key, old time, new time) that got slower than threshold
+def compare(results, old_results, threshold):
+    old = {result_key(r): r for r in old_results}
+    res = []
+    for r in results:
+        o = old.get(result_key(r))
+        if o is None or o['timed_out'] or r['timed_out']:
+            continue
+        ratio = r['wall_time'] / o['wall_time'] if o['wall_time'] > 0 else 1.0
+        logger.info("%-16s %-16s %5d %9.3f s -> %9.3f s (%.2fx)", r['solver'], r['map'], r['size'], o['wall_time'], r['wall_time'], ratio)
+        if ratio > 1.0 + threshold:
+            res.append((result_key(r), o['wall_time'], r['wall_time']))
+        if r['kind'] == 'pathfinder' and (r['path_length'] != o['path_length'] or r['steps'] != o['steps']):
+            logger.warning("%s on %s size %d: path length %d -> %d, steps %d -> %d",
+                           r['solver'], r['map'], r['size'], o['path_length'], r['path_length'], o['steps'], r['steps'])
+    return res
+
+
+# Headless benchmark of solvers over seeded mazes and open maps
+# Results are written to json file, and optionally compared to an earlier results file
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark path finders and maze generators')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Grid sizes, up to %d' % ALL_SIZES[-1])
+    parser.add_argument('--all-sizes', action='store_true', help='Run all sizes %s' % ALL_SIZES)
+    parser.add_argument('--solvers', nargs='+', default=list(slvr.SOLVERS), choices=list(slvr.SOLVERS),
+                        help='Solvers to run, generators are also used to build maze maps')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for maze generators')
+    parser.add_argument('--time-limit', type=float, default=60.0,
+                        help='Seconds before a single run is stopped, 0 for no limit')
+    parser.add_argument('--mode', default='auto', choices=MODES,
+                        help='auto runs solve_all of solvers that have their own, steps times solve_step loops')
+    parser.add_argument('--no-memory', action='store_true', help='Skip peak memory measurement runs')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='Results file')
+    parser.add_argument('--compare', help='Earlier results file to compare wall times with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative slowdown reported as regression')
+    args = parser.parse_args()
+
+    # Solvers log every found path
+    logging.getLogger(slvr.__name__).setLevel(logging.WARNING)
+
+    sizes = ALL_SIZES if args.all_sizes else args.sizes
+    results = run_benchmark(sizes, args.seed, args.solvers, args.time_limit, not args.no_memory, args.mode)
+    out = {
+        'python': sys.version,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sizes': sizes,
+        'seed': args.seed,
+        'time_limit': args.time_limit,
+        'mode': args.mode,
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(out, f, indent=2)
+    logger.info("Wrote %d results to %s", len(results), args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        regressions = compare(results, old['results'], args.threshold)
+        for key, t_old, t_new in regressions:
+            logger.warning("Regression %s: %.3f s -> %.3f s", key, t_old, t_new)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
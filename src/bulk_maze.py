@@ -0,0 +1,60 @@
+import numpy as np
+
+from cell_grid import CellType
+
+# Whole mazes generated with array operations
+# Layout is the same as with the step by step generators: cells on odd x and y
+# between the border walls are rooms, and a room is joined to a neighboring room by
+# carving the wall cell between them. Functions return height x width uint8 arrays
+# of CellType values indexed [y, x].
+
+FLOOR = CellType.FLOOR.value
+WALL = CellType.WALL.value
+
+
+def _rooms(width, height):
+    res = np.full((height, width), WALL, dtype=np.uint8)
+    res[1:height - 1:2, 1:width - 1:2] = FLOOR
+    return res, np.arange(1, width - 1, 2), np.arange(1, height - 1, 2)
+
+
+# Binary tree maze, every room is joined to its horizontal or vertical neighbor in
+# direction (dx, dy), whichever exists, randomly if both do
+def binary_tree(width, height, direction=(1, -1), rng=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    dx, dy = direction
+    res, x_coords, y_coords = _rooms(width, height)
+    if x_coords.size == 0 or y_coords.size == 0:
+        return res
+    ys, xs = np.meshgrid(y_coords, x_coords, indexing='ij')
+    can_h = (xs + 2 * dx >= 1) & (xs + 2 * dx <= width - 2)
+    can_v = (ys + 2 * dy >= 1) & (ys + 2 * dy <= height - 2)
+    vertical = rng.integers(0, 2, xs.shape, dtype=np.uint8).astype(bool)
+    horizontal = can_h & (~can_v | ~vertical)
+    vertical = can_v & (~can_h | vertical)
+    res[ys[horizontal], xs[horizontal] + dx] = FLOOR
+    res[ys[vertical] + dy, xs[vertical]] = FLOOR
+    return res
+
+
+# Sidewinder maze, rows are split in random runs of rooms joined eastwards, and every
+# run is joined north from one random room. First row is a single run.
+def sidewinder(width, height, rng=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    res, x_coords, y_coords = _rooms(width, height)
+    if x_coords.size == 0 or y_coords.size == 0:
+        return res
+    rows, cols = (y_coords.size, x_coords.size)
+    # Runs end randomly, and always at the east end of a row
+    close = rng.integers(0, 2, (rows, cols), dtype=np.uint8).astype(bool)
+    close[0, :] = False
+    close[:, -1] = True
+    ys, xs = np.meshgrid(y_coords, x_coords, indexing='ij')
+    east = ~close
+    res[ys[east], xs[east] + 1] = FLOOR
+
+    ends = np.flatnonzero(close[1:])
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    chosen = starts + (rng.random(ends.size) * (ends - starts + 1)).astype(np.int64)
+    res[ys[1:].ravel()[chosen] - 1, xs[1:].ravel()[chosen]] = FLOOR
+    return res
@@ -2,11 +2,11 @@ from pygame import Rect
 
 
 class GridCamera:
-    def __init__(self, x, y, w_size):
+    def __init__(self, x, y, width, height=None):
         self.x = x
         self.y = y
-        self.width = w_size
-        self.height = w_size
+        self.width = width
+        self.height = height if height is not None else width
         self.current_scale = 1
         self.dragging = False
         self.drag_x = 0
@@ -43,3 +43,4 @@ class GridCamera:
 
     def get_camera_rect(self):
         rect = Rect(self.x, self.y, self.width, self.height)
+        return rect
@@ -1,14 +1,17 @@
 
+from array import array
 from enum import Enum
 from pathlib import Path
+import mmap
+import struct
+import weakref
+import zlib
 
 import logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-import pygame
-
-from camera import GridCamera
+import numpy as np
 
 MAP_DIRECTORY = Path(__file__).parent.parent / 'maps'
 
@@ -18,172 +21,486 @@ class CellType(Enum):
     START = 2
     END = 3
 
-CELL_COLORS = {
-    CellType.WALL: (0, 0, 0),
-    CellType.FLOOR: (50, 180, 180),
-    CellType.START: (200, 40, 40),
-    CellType.END: (40, 250, 40)
-}
 
+# Lookup table from CellType value to CellType, faster than calling CellType(value)
+CELL_TYPES = tuple(CellType)
+
+# Type value of walls, enum attribute lookups are slow in hot loops
+WALL_VALUE = CellType.WALL.value
+FLOOR_VALUE = CellType.FLOOR.value
+
+# Default g cost of unvisited cells
+G_MAX = 1000000.0
+
+# Move cost of diagonal steps
+DIAG_COST = 1.414213
+
+# Moves of the 8 direction movement model as (dx, dy, cost), straight moves first
+# Diagonal moves need at least one of the two adjacent straight cells free
+MOVES = ((1, 0, 1.0), (0, 1, 1.0), (-1, 0, 1.0), (0, -1, 1.0),
+         (1, 1, DIAG_COST), (-1, 1, DIAG_COST), (-1, -1, DIAG_COST), (1, -1, DIAG_COST))
+
+# Above this share of edited cells move masks are compiled again instead of patched
+MASK_PATCH_LIMIT = 1 / 64
+
+# Terrain cost range of cells, plain floor costs TERRAIN_MIN
+# A move costs its MOVES cost times the mean terrain cost of the two cells, so moves
+# cost the same both ways. Costs fit one digit for text maps.
+TERRAIN_MIN = 1
+TERRAIN_MAX = 9
+
+
+# Cells per side of a storage chunk, as power of two
+CHUNK_SHIFT = 6
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+CHUNK_CELLS = CHUNK_SIZE * CHUNK_SIZE
+
+
+# Move mask of every cell of types as bytearray, bit i allows move MOVES[i]
+def compile_move_masks(types, width, height):
+    walkable = np.pad(np.frombuffer(types, dtype=np.uint8).reshape(height, width) != WALL_VALUE, 1)
+    res = np.zeros((height, width), dtype=np.uint8)
+    x_end = width + 1
+    y_end = height + 1
+    for bit, (dx, dy, _) in enumerate(MOVES):
+        ok = walkable[1 + dy:y_end + dy, 1 + dx:x_end + dx]
+        if dx != 0 and dy != 0:
+            ok = ok & (walkable[1:-1, 1 + dx:x_end + dx] | walkable[1 + dy:y_end + dy, 1:-1])
+        res |= ok.astype(np.uint8) << bit
+    return bytearray(res.tobytes())
+
+
+# Moves of each move mask as tuple of (index offset, dx, dy, cost) for grid width
+def move_table(width):
+    return [tuple((dy * width + dx, dx, dy, cost) for bit, (dx, dy, cost) in enumerate(MOVES) if mask >> bit & 1)
+            for mask in range(256)]
+
+
+# Byte values of a width x height area kept in CHUNK_SIZE x CHUNK_SIZE chunks
+# A chunk is a plain int while all its cells have the same value, and gets a
+# buffer of CHUNK_CELLS bytes in row order on the first write of another value,
+# so memory follows map content instead of map area. Chunks at the right and
+# bottom edges are padded to full size, padding is never read.
+class CellChunks:
+    def __init__(self, width, height, value=0):
+        self.width = width
+        self.height = height
+        self.columns = (width + CHUNK_MASK) >> CHUNK_SHIFT
+        self.rows = (height + CHUNK_MASK) >> CHUNK_SHIFT
+        self.chunks = [value] * (self.columns * self.rows)
+
+    # Chunks built from flat buffer of width * height values in row order
+    @classmethod
+    def from_flat(cls, values, width, height):
+        res = cls(width, height)
+        cells = np.frombuffer(values, dtype=np.uint8).reshape(height, width)
+        pad_y = res.rows * CHUNK_SIZE - height
+        pad_x = res.columns * CHUNK_SIZE - width
+        # Padding repeats edge cells, so edge chunks of equal cells stay uniform
+        blocks = np.pad(cells, ((0, pad_y), (0, pad_x)), mode='edge').reshape(
+            res.rows, CHUNK_SIZE, res.columns, CHUNK_SIZE).swapaxes(1, 2)
+        firsts = blocks[:, :, 0, 0]
+        uniform = (blocks == firsts[:, :, None, None]).all(axis=(2, 3))
+        res.chunks = firsts.ravel().tolist()
+        for c in np.flatnonzero(~uniform).tolist():
+            res.chunks[c] = bytearray(blocks[divmod(c, res.columns)].tobytes())
+        return res
+
+    def copy(self):
+        res = CellChunks(self.width, self.height)
+        res.chunks = [c if type(c) is int else bytearray(c) for c in self.chunks]
+        return res
+
+    def get(self, x, y):
+        chunk = self.chunks[(y >> CHUNK_SHIFT) * self.columns + (x >> CHUNK_SHIFT)]
+        if type(chunk) is int:
+            return chunk
+        return chunk[(y & CHUNK_MASK) << CHUNK_SHIFT | x & CHUNK_MASK]
+
+    def set(self, x, y, value):
+        c = (y >> CHUNK_SHIFT) * self.columns + (x >> CHUNK_SHIFT)
+        chunk = self.chunks[c]
+        if type(chunk) is int:
+            if chunk == value:
+                return
+            chunk = self.chunks[c] = bytearray([chunk]) * CHUNK_CELLS
+        chunk[(y & CHUNK_MASK) << CHUNK_SHIFT | x & CHUNK_MASK] = value
+
+    # Set value of cells in rectangle x0 <= x < x1, y0 <= y < y1
+    # Chunks covered whole become uniform
+    def fill(self, x0, y0, x1, y1, value):
+        for c, (cx0, cy0, cx1, cy1) in self.__overlaps(x0, y0, x1, y1):
+            if (cx0, cy0, cx1, cy1) == self.__bounds(c):
+                self.chunks[c] = value
+            elif self.chunks[c] != value:
+                self.__array(c)[cy0 & CHUNK_MASK:((cy1 - 1) & CHUNK_MASK) + 1,
+                                cx0 & CHUNK_MASK:((cx1 - 1) & CHUNK_MASK) + 1] = value
+
+    # Values of rectangle x0 <= x < x1, y0 <= y < y1 as uint8 array indexed [y, x]
+    # Written to out if given
+    def region(self, x0, y0, x1, y1, out=None):
+        res = out if out is not None else np.empty((y1 - y0, x1 - x0), dtype=np.uint8)
+        for c, (cx0, cy0, cx1, cy1) in self.__overlaps(x0, y0, x1, y1):
+            dst = res[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+            chunk = self.chunks[c]
+            if type(chunk) is int:
+                dst.fill(chunk)
+            else:
+                dst[:] = np.frombuffer(chunk, dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE)[
+                    cy0 & CHUNK_MASK:((cy1 - 1) & CHUNK_MASK) + 1, cx0 & CHUNK_MASK:((cx1 - 1) & CHUNK_MASK) + 1]
+        return res
 
+    # All values as flat bytearray of width * height values in row order
+    def to_flat(self):
+        res = bytearray(self.width * self.height)
+        self.region(0, 0, self.width, self.height, np.frombuffer(res, dtype=np.uint8).reshape(self.height, self.width))
+        return res
+
+    # Position (x, y) of a cell with value, None if there is none
+    def find(self, value):
+        for c, chunk in enumerate(self.chunks):
+            cx0, cy0, cx1, cy1 = self.__bounds(c)
+            if type(chunk) is int:
+                if chunk == value:
+                    return (cx0, cy0)
+                continue
+            hits = np.flatnonzero(self.__array(c)[:cy1 - cy0, :cx1 - cx0] == value)
+            if hits.size:
+                y, x = divmod(int(hits[0]), cx1 - cx0)
+                return (cx0 + x, cy0 + y)
+        return None
+
+    # Smallest and largest value
+    def value_range(self):
+        lo, hi = (255, 0)
+        for c, chunk in enumerate(self.chunks):
+            if type(chunk) is int:
+                lo, hi = (min(lo, chunk), max(hi, chunk))
+            else:
+                cx0, cy0, cx1, cy1 = self.__bounds(c)
+                cells = self.__array(c)[:cy1 - cy0, :cx1 - cx0]
+                lo, hi = (min(lo, int(cells.min())), max(hi, int(cells.max())))
+        return lo, hi
+
+    # Free buffers of chunks whose cells all have the same value again
+    def compact(self):
+        for c, chunk in enumerate(self.chunks):
+            if type(chunk) is not int:
+                cx0, cy0, cx1, cy1 = self.__bounds(c)
+                cells = self.__array(c)[:cy1 - cy0, :cx1 - cx0]
+                if (cells == cells[0, 0]).all():
+                    self.chunks[c] = int(cells[0, 0])
+
+    # Value of uniform chunks if all cells have it, else None
+    def uniform_value(self):
+        values = set(c for c in self.chunks if type(c) is int)
+        if len(values) == 1 and self.allocated() == 0:
+            return values.pop()
+        return None
+
+    # Number of chunks with a buffer
+    def allocated(self):
+        return sum(1 for c in self.chunks if type(c) is not int)
+
+    # Bytes in chunk buffers
+    def nbytes(self):
+        return self.allocated() * CHUNK_CELLS
+
+    # Cell rectangle (x0, y0, x1, y1) of chunk, without padding
+    def __bounds(self, c):
+        cy, cx = divmod(c, self.columns)
+        x0 = cx << CHUNK_SHIFT
+        y0 = cy << CHUNK_SHIFT
+        return (x0, y0, min(self.width, x0 + CHUNK_SIZE), min(self.height, y0 + CHUNK_SIZE))
+
+    # Chunks overlapping rectangle as (chunk index, overlapping cell rectangle)
+    def __overlaps(self, x0, y0, x1, y1):
+        for cy in range(y0 >> CHUNK_SHIFT, ((y1 - 1) >> CHUNK_SHIFT) + 1):
+            for cx in range(x0 >> CHUNK_SHIFT, ((x1 - 1) >> CHUNK_SHIFT) + 1):
+                yield (cy * self.columns + cx,
+                       (max(x0, cx << CHUNK_SHIFT), max(y0, cy << CHUNK_SHIFT),
+                        min(x1, (cx + 1) << CHUNK_SHIFT), min(y1, (cy + 1) << CHUNK_SHIFT)))
+
+    # Writable array view of chunk indexed [y, x], uniform chunk gets a buffer
+    def __array(self, c):
+        chunk = self.chunks[c]
+        if type(chunk) is int:
+            chunk = self.chunks[c] = bytearray([chunk]) * CHUNK_CELLS
+        return np.frombuffer(chunk, dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE)
+
+
+# Lightweight view of a single square in CellGrid
+# Cell data lives in typed arrays of the grid, views are created on demand by
+# get_cell and __iter__. Two views of the same square compare equal.
 class Cell:
-    def __init__(self, x, y, size, c_type=CellType.FLOOR):
+    __slots__ = ('x', 'y', '_grid', '_idx')
+
+    def __init__(self, grid, x, y):
         self.x = x
         self.y = y
-        self.size = size
-        self.type: CellType = c_type
-
-        self.f = 0
-        self.h = 0
-        self.g = 1000000.0
-
-        self.previous = None
-
-    # Draw cell
-    def show(self, surface, c_color=None):
-        if c_color:
-            color = c_color
-        elif self.type in CELL_COLORS:
-            color = CELL_COLORS[self.type]
-        
-        #logger.info("Cell (%f, %f) size: %f", mx, my, msz)
-        pygame.draw.rect(surface, color, pygame.Rect(self.x * self.size, self.y*self.size, self.size, self.size))
-        #g_str = "{0:.3f}".format(self.g)
-        #mfont = pygame.font.Font(pygame.font.get_default_font(), 8)
-        #text_surface = mfont.render(g_str, True, (0, 0, 0))
-        #window.blit(text_surface, dest=(self.x*self.size,self.y*self.size))
-    
+        self._grid = grid
+        self._idx = y * grid.width + x
+
+    @property
+    def size(self):
+        return self._grid.cell_size
+
+    @property
+    def type(self) -> CellType:
+        grid = self._grid
+        if grid._chunks is not None:
+            return CELL_TYPES[grid._chunks.get(self.x, self.y)]
+        return CELL_TYPES[grid._types[self._idx]]
+
+    @type.setter
+    def type(self, c_type):
+        grid = self._grid
+        if grid._chunks is not None:
+            grid._chunks.set(self.x, self.y, c_type.value)
+        else:
+            grid._types[self._idx] = c_type.value
+        if grid._dirty is not None:
+            grid._dirty.add(self._idx)
+        if grid._masks is not None:
+            grid._mask_dirty.add(self._idx)
+        if grid._edit_logs:
+            for log in grid._edit_logs:
+                log.add(self._idx)
+
+    @property
+    def f(self):
+        return self._grid._f[self._idx]
+
+    @f.setter
+    def f(self, value):
+        self._grid._f[self._idx] = value
+
+    @property
+    def h(self):
+        return self._grid._h[self._idx]
+
+    @h.setter
+    def h(self, value):
+        self._grid._h[self._idx] = value
+
+    @property
+    def g(self):
+        return self._grid._g[self._idx]
+
+    @g.setter
+    def g(self, value):
+        self._grid._g[self._idx] = value
+
+    @property
+    def previous(self):
+        p_idx = self._grid._previous[self._idx]
+        if p_idx < 0:
+            return None
+        return self._grid.get_cell_by_index(p_idx)
+
+    @previous.setter
+    def previous(self, cell):
+        self._grid._previous[self._idx] = -1 if cell is None else cell._idx
+
+    def __eq__(self, other):
+        return isinstance(other, Cell) and self._idx == other._idx and self._grid is other._grid
+
+    def __hash__(self):
+        return self._idx
+
     def __repr__(self):
         return "Cell (%d, %d), type: %s" % (self.x, self.y, self.type)
 
+
+# Cells with changed type since last pop, taken from CellGrid.log_type_edits
+# Lets caches of grid content, like ClusterGraph, update only what was edited.
+class TypeEditLog:
+    def __init__(self):
+        self.__cells = set()
+
+    def add(self, idx):
+        if self.__cells is not None:
+            self.__cells.add(idx)
+
+    # Log all cells, when types were replaced as a whole
+    def add_all(self):
+        self.__cells = None
+
+    # Indices of logged cells, None if all cells have to be considered changed
+    # Log starts over empty
+    def pop(self):
+        res = self.__cells
+        self.__cells = set()
+        return res
+
+
+# Grid of cells stored as struct of arrays
+# Grid is width x height cells, height is width if not given. Cell types and
+# terrain costs are kept in CellChunks while the grid is edited, so a mostly empty
+# map takes memory by its content. Solvers work on flat uint8 arrays indexed by
+# y * width + x, those are unpacked from the chunks on first use, and compact packs
+# them back. Search values are typed arrays in the same layout. CellGrid has no
+# display dependencies, rendering and editing live in grid_view.GridView.
+# Optional types is CellChunks or a writable buffer of width * height cell type
+# values used as storage as is, start and end are searched from it if not given.
+# Optional costs are terrain costs in the same form.
 class CellGrid:
-    def __init__(self, size, c_size=12):
+    def __init__(self, width, c_size=12, types=None, start=None, end=None, costs=None, height=None):
         self.cell_size = c_size
-        self.size = size
-        self.__cell_grid = None
+        self.width = width
+        self.height = height if height is not None else width
+        self._chunks = None  # Cell types as CellChunks, None while unpacked to _types
+        self._cost_chunks = None  # Terrain costs as CellChunks while packed, None means all cost TERRAIN_MIN
+        self._dirty = None  # Indices of cells with changed type, None means all
+        self._masks = None  # Allowed moves of each cell as bits of MOVES, compiled on first use
+        self._mask_dirty = set()  # Indices of cells with changed type since masks were updated
+        self._edit_logs = weakref.WeakSet()  # TypeEditLogs of log_type_edits
+        self._search_owner = None  # Solver whose last run the search values hold, see Solver._reset_search
         self.start_cell: Cell = None
         self.end_cell: Cell = None
-        self.reset_cells()
+        if types is None:
+            self.reset_cells()
+        else:
+            self.__set_types(types, start, end)
+        if costs is not None:
+            self.set_costs(costs)
+
+    # Search value arrays are allocated on first use, loaded grids don't pay for them until solved
+    # Flat type and cost arrays are unpacked from chunks on first use
+    def __getattr__(self, name):
+        if name in ('_f', '_h', '_g', '_previous'):
+            self.reset_heuristics()
+            return self.__dict__[name]
+        if name in ('_types', '_costs') and self.__dict__.get('_chunks') is not None:
+            self.__unpack()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def __set_types(self, types, start, end):
+        if isinstance(types, CellChunks):
+            if (types.width, types.height) != (self.width, self.height):
+                raise ValueError("Expected %dx%d cell types, got %dx%d" % (self.width, self.height, types.width, types.height))
+            self._chunks = types
+        else:
+            if len(types) != self.width * self.height:
+                raise ValueError("Expected %d cell types, got %d" % (self.width * self.height, len(types)))
+            self._types = types
+            self._costs = None
+        self._masks = None
+        if start is None:
+            start = self.__find_type(CellType.START) or (1, 1)
+        if end is None:
+            end = self.__find_type(CellType.END) or (self.width-2, self.height-2)
+        self.start_cell = self.get_cell(*start)
+        self.end_cell = self.get_cell(*end)
+
+    # Position (x, y) of first cell of type, None if there is none
+    def __find_type(self, c_type):
+        if self._chunks is not None:
+            return self._chunks.find(c_type.value)
+        try:
+            idx = self._types.index(c_type.value)
+        except ValueError:
+            return None
+        return (idx % self.width, idx // self.width)
+
+    # Unpack cell types and terrain costs from chunks to flat arrays
+    def __unpack(self):
+        types, costs = (self._chunks, self._cost_chunks)
+        self._chunks = None
+        self._cost_chunks = None
+        self._types = types.to_flat()
+        self._costs = costs.to_flat() if costs is not None else None
+        self._masks = None
+        self._mask_dirty = set()
+
+    # Pack cell types and terrain costs to chunks and free flat arrays, move masks
+    # and search values. Solvers unpack them again on first use.
+    def compact(self):
+        if self._chunks is None:
+            self._chunks = CellChunks.from_flat(self._types, self.width, self.height)
+            costs = self._costs
+            self._cost_chunks = CellChunks.from_flat(costs, self.width, self.height) if costs is not None else None
+            if self._cost_chunks is not None and self._cost_chunks.uniform_value() == TERRAIN_MIN:
+                self._cost_chunks = None
+            self.__drop_arrays()
+        else:
+            self._chunks.compact()
+            if self._cost_chunks is not None:
+                self._cost_chunks.compact()
+
+    # Check if cell types are kept in chunks
+    @property
+    def packed(self):
+        return self._chunks is not None
+
+    # Bytes taken by cell types and terrain costs
+    def storage_size(self):
+        if self._chunks is not None:
+            res = self._chunks.nbytes() + len(self._chunks.chunks) * 8
+            if self._cost_chunks is not None:
+                res += self._cost_chunks.nbytes() + len(self._cost_chunks.chunks) * 8
+            return res
+        return len(self._types) + (len(self._costs) if self._costs is not None else 0)
 
-        self.camera = GridCamera(0, 0, self.size * self.cell_size)
-        #self.surface = pygame.Surface((self.size, self.size))
+    def __drop_arrays(self):
+        for name in ('_types', '_costs', '_f', '_h', '_g', '_previous'):
+            self.__dict__.pop(name, None)
+        self._search_owner = None
+        self._masks = None
+        self._mask_dirty = set()
 
     def __iter__(self):
-        for j in range(0, self.size):
-            for i in range(0, self.size):
-                yield self.__cell_grid[j][i]
-
-    # Edit maze
-    # Returns edited cell or None
-    def edit(self):
-        m_x, m_y = pygame.mouse.get_pos()
-        c_x, c_y = self.cell_index(m_x, m_y)
-        res = None
-        if not self.in_bounds(c_x, c_y, 1):
-            return res
-        #if not self.camera.in_bounds(m_x, m_y):
-        #    return res
-        
-        #logger.info("m_xy (%d, %d) cxy (%d, %d)", m_x, m_y, c_x, c_y)
-        keys_pressed = pygame.key.get_pressed()
-        
-        if keys_pressed[pygame.K_s]:
-            self.set_cell_type(c_x, c_y, CellType.START)
-            logger.debug("Set START cell to (%d, %d)", c_x, c_y)
-            res = self.get_cell(c_x, c_y)
-        elif keys_pressed[pygame.K_e]:
-            self.set_cell_type(c_x, c_y, CellType.END)
-            logger.debug("Set END cell to (%d, %d)", c_x, c_y)
-            res = self.get_cell(c_x, c_y)
-        elif keys_pressed[pygame.K_w]:
-            if self.set_cell_type(c_x, c_y, CellType.WALL):
-                logger.debug('Dont overwrite start or end!')
-            else:
-                logger.debug("Edit cell (%d, %d) type to WALL", c_x, c_y)
-            res = self.get_cell(c_x, c_y)
-        elif keys_pressed[pygame.K_f]:
-            if self.set_cell_type(c_x, c_y, CellType.FLOOR):
-                logger.debug('Dont overwrite start or end!')
-            else:
-                logger.debug("Edit cell (%d, %d) type to FLOOR", c_x, c_y)
-            res = self.get_cell(c_x, c_y)
-            self.set_cell_type(c_x, c_y, CellType.FLOOR)
-            logger.debug("Edit cell (%d, %d) type to WALL", c_x, c_y)
-            res = self.get_cell(c_x, c_y)
-        
-        return res
-
-    # Should be called after every zoom/drag operation
-    def __clip_camera(self):
-        s = self.size * self.cell_size * self.camera.current_scale
-        # TODO: variable width/height instead of constant
-        newx = min(s - 400, max(0, self.camera.x))
-        newy = min(s - 400, max(0, self.camera.y))
-        self.camera.x = newx
-        self.camera.y = newy
-
-    def drag_grid(self):
-        cx = self.camera.x - self.camera.drag_x
-        cy = self.camera.y - self.camera.drag_y
-        self.camera.x = cx
-        self.camera.y = cy
-        self.__clip_camera()
-        logger.info("Dragging grid - nxy (%f, %f) dxy (%f, %f)", cx, cy, self.camera.drag_x, self.camera.drag_y)
-        self.camera.drag_x = 0
-        self.camera.drag_y = 0
-
-    def zoom_grid(self, mx, my, zoom_in):
-        self.camera.zoom(mx, my, zoom_in)
-        self.__clip_camera()
-        logger.debug("Zooming grid - Mouse pos: (%d, %d), size: (%d), x_off: (%f), y_off: (%f) cur_scale: (%f), zoom_upd (%f)",
-                    mx, my, self.camera.width,
-                    self.camera.x, self.camera.y,
-                    self.camera.current_scale,
-                    zoom_in)
-
-    # Draw CellGrid cells
-    def show(self, surface, solver_cells):
-        # Cull unvisible cells, ie. out of camera boundaries
-        #count = 0
-        for cell in self:
-            #s = self.cell_size * self.camera.current_scale
-            #cx = cell.x * s
-            #cy = cell.y * s
-            #cams = self.camera.width
-            #if cx >= self.camera.x - s and cx < self.camera.x + cams \
-            #    and cy >= self.camera.y - s and cy < self.camera.y + cams:
-            cell.show(surface)
-                #count += 1
-        #logger.info("rendered %d cells", count)
+        for j in range(0, self.height):
+            for i in range(0, self.width):
+                yield Cell(self, i, j)
 
     def reset_cells(self):
-        self.__cell_grid = [[Cell(x, y, self.cell_size) for x in range(0, self.size)] for y in range(0, self.size)]
-        for x in range(0, self.size):
-            self.__cell_grid[0][x].type = CellType.WALL
-            self.__cell_grid[self.size-1][x].type = CellType.WALL
-            self.__cell_grid[x][0].type = CellType.WALL
-            self.__cell_grid[x][self.size-1].type = CellType.WALL
+        self.__drop_arrays()
+        w, h = (self.width, self.height)
+        wall = CellType.WALL.value
+        types = CellChunks(w, h, CellType.FLOOR.value)
+        types.fill(0, 0, w, 1, wall)
+        types.fill(0, h - 1, w, h, wall)
+        types.fill(0, 0, 1, h, wall)
+        types.fill(w - 1, 0, w, h, wall)
+        self._chunks = types
+        self._cost_chunks = None
+        self._dirty = None
+        self.__log_all_edits()
 
         self.start_cell = self.get_cell(1, 1)
         self.start_cell.type = CellType.START
 
-        self.end_cell = self.get_cell(self.size-2, self.size-2)
+        self.end_cell = self.get_cell(w-2, h-2)
         self.end_cell.type = CellType.END
 
+    # Reset search values of all cells
+    def reset_heuristics(self, g=G_MAX):
+        n = self.width * self.height
+        self._f = array('d', [0.0]) * n
+        self._h = array('d', [0.0]) * n
+        self._g = array('d', [g]) * n
+        self._previous = array('i', [-1]) * n
+        self._search_owner = None
+
+    # Copy of cell types, terrain costs, start and end, search values are not copied
+    # Packed grid gives a packed copy
+    def copy(self):
+        start, end = ((self.start_cell.x, self.start_cell.y), (self.end_cell.x, self.end_cell.y))
+        if self._chunks is not None:
+            costs = self._cost_chunks.copy() if self._cost_chunks is not None else None
+            return CellGrid(self.width, self.cell_size, self._chunks.copy(), start, end, costs, self.height)
+        costs = bytearray(self._costs) if self._costs is not None else None
+        return CellGrid(self.width, self.cell_size, bytearray(self._types), start, end, costs, self.height)
+
     # Check if x and y are in bounds of CellGrid
     # Optional in_off parameter for offset generation
     def in_bounds(self, x, y, in_off=0):
-        return x >= 0 + in_off and x < self.size - in_off and y >= 0 + in_off and y < self.size - in_off
+        return x >= 0 + in_off and x < self.width - in_off and y >= 0 + in_off and y < self.height - in_off
 
 
-    # Returns grid indices from mouse position
-    def cell_index(self, m_x, m_y):
-        m_x, m_y = self.camera.screen_to_grid(m_x, m_y)
-        c_x = int(m_x / self.cell_size)
-        c_y = int(m_y / self.cell_size)
-        #logger.debug("Calling cell_index: mx, my (%f, %f) cx, cy (%d, %d)", m_x, m_y, c_x, c_y)
-        return (c_x, c_y)
-
     # Helper function to reconstruct path from current cell
     def get_path(self, current_cell):
         res = []
@@ -204,6 +521,10 @@ class CellGrid:
                 res.append(self.get_cell(n_x, n_y))
         return res
 
+    # Check if x and y are in bounds and not a wall
+    def walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self._types[y * self.width + x] != WALL_VALUE
+
     # Get all cells by type
     # Optional not operator parameter
     def get_cells(self, cell_type, not_op=True):
@@ -215,29 +536,40 @@ class CellGrid:
                 res.append(cell)
         return res
 
-    # Set Cell
+    # Set Cell, copies type and search values of cell to x, y
     def set_cell(self, x, y, cell):
-        self.__cell_grid[y][x] = cell
+        idx = y * self.width + x
+        self._types[idx] = cell.type.value
+        self._f[idx] = cell.f
+        self._h[idx] = cell.h
+        self._g[idx] = cell.g
+        prev = cell.previous
+        self._previous[idx] = -1 if prev is None else prev._idx
+        if self._dirty is not None:
+            self._dirty.add(idx)
+        if self._masks is not None:
+            self._mask_dirty.add(idx)
+        if self._edit_logs:
+            for log in self._edit_logs:
+                log.add(idx)
     
     # Get Cell
     def get_cell(self, x, y):
-        return self.__cell_grid[y][x]
+        return Cell(self, x, y)
 
     # Set cell type
     def set_cell_type(self, x, y, c_type):
         res = None
         if c_type == CellType.START:
-            s_x, s_y = (self.start_cell.x, self.start_cell.y)
-            self.__cell_grid[s_y][s_x].type = CellType.FLOOR
+            self.start_cell.type = CellType.FLOOR
             self.start_cell = self.get_cell(x, y)
-            self.__cell_grid[y][x].type = CellType.START
-            res = self.__cell_grid[y][x]
+            self.start_cell.type = CellType.START
+            res = self.start_cell
         elif c_type == CellType.END:
-            e_x, e_y = (self.end_cell.x, self.end_cell.y)
-            self.__cell_grid[e_y][e_x].type = CellType.FLOOR
+            self.end_cell.type = CellType.FLOOR
             self.end_cell = self.get_cell(x, y)
-            self.__cell_grid[y][x].type = CellType.END
-            res = self.__cell_grid[y][x]
+            self.end_cell.type = CellType.END
+            res = self.end_cell
         else:
             cur_cell = self.get_cell(x, y)
             if cur_cell.type != CellType.START and cur_cell.type != CellType.END:
@@ -247,22 +579,184 @@ class CellGrid:
 
     # Get cell type
     def get_cell_type(self, x, y):
-        return self.__cell_grid[y][x].type
+        if self._chunks is not None:
+            return CELL_TYPES[self._chunks.get(x, y)]
+        return CELL_TYPES[self._types[y * self.width + x]]
 
     # Set cell type for all cells
     def set_cell_type_forall(self, c_type):
-        for c_row in self.__cell_grid:
-            for c in c_row:
-                c.type = c_type
+        if self._chunks is not None:
+            self._chunks = CellChunks(self.width, self.height, c_type.value)
+        else:
+            self._types = array('B', [c_type.value]) * (self.width * self.height)
+        self._dirty = None
+        self._masks = None
+        self.__log_all_edits()
+
+    # Set types of all cells from buffer of width * height type values in row order
+    def set_types(self, values):
+        if self._chunks is not None:
+            self.__unpack()
+        types = array('B')
+        types.frombytes(values)
+        self._types = types
+        self._dirty = None
+        self._masks = None
+        self.__log_all_edits()
+
+    # Mark all cell types changed, for code that writes _types directly
+    def types_changed(self):
+        self._dirty = None
+        self._masks = None
+        self.__log_all_edits()
+
+    # Log of cell type edits from now on, grid keeps it only while the caller does
+    def log_type_edits(self):
+        log = TypeEditLog()
+        self._edit_logs.add(log)
+        return log
+
+    def __log_all_edits(self):
+        for log in self._edit_logs:
+            log.add_all()
+
+    # Cell type values of rectangle x0 <= x < x1, y0 <= y < y1 as uint8 array indexed [y, x]
+    # Packed grid is not unpacked
+    def type_region(self, x0, y0, x1, y1):
+        if self._chunks is not None:
+            return self._chunks.region(x0, y0, x1, y1)
+        return np.frombuffer(self._types, dtype=np.uint8).reshape(self.height, self.width)[y0:y1, x0:x1]
+
+    # Terrain costs of rectangle like type_region, None if grid has no terrain
+    def cost_region(self, x0, y0, x1, y1):
+        if self._chunks is not None:
+            costs = self._cost_chunks
+            return costs.region(x0, y0, x1, y1) if costs is not None else None
+        if self._costs is None:
+            return None
+        return np.frombuffer(self._costs, dtype=np.uint8).reshape(self.height, self.width)[y0:y1, x0:x1]
+
+    # Cell types and terrain costs as CellChunks, costs None without terrain
+    # Chunks of packed grid are returned as is, unpacked grid is not packed
+    def chunks(self):
+        if self._chunks is not None:
+            return (self._chunks, self._cost_chunks)
+        costs = self._costs
+        return (CellChunks.from_flat(self._types, self.width, self.height),
+                CellChunks.from_flat(costs, self.width, self.height) if costs is not None else None)
+
+    # Terrain cost of cell
+    def get_cost(self, x, y):
+        if self._chunks is not None:
+            return self._cost_chunks.get(x, y) if self._cost_chunks is not None else TERRAIN_MIN
+        if self._costs is None:
+            return TERRAIN_MIN
+        return self._costs[y * self.width + x]
+
+    # Set terrain cost of cell, cost storage is allocated on first cost other than TERRAIN_MIN
+    def set_cost(self, x, y, cost):
+        if not TERRAIN_MIN <= cost <= TERRAIN_MAX:
+            raise ValueError("Terrain cost %d not in range %d-%d" % (cost, TERRAIN_MIN, TERRAIN_MAX))
+        idx = y * self.width + x
+        if self._chunks is not None:
+            if self._cost_chunks is None:
+                if cost == TERRAIN_MIN:
+                    return
+                self._cost_chunks = CellChunks(self.width, self.height, TERRAIN_MIN)
+            self._cost_chunks.set(x, y, cost)
+        else:
+            if self._costs is None:
+                if cost == TERRAIN_MIN:
+                    return
+                self._costs = array('B', [TERRAIN_MIN]) * (self.width * self.height)
+            self._costs[idx] = cost
+        if self._dirty is not None:
+            self._dirty.add(idx)
+
+    # Set terrain costs of all cells from CellChunks or writable buffer of width * height
+    # costs in row order. None makes every cell cost TERRAIN_MIN
+    def set_costs(self, values):
+        if values is not None:
+            if isinstance(values, CellChunks):
+                if (values.width, values.height) != (self.width, self.height):
+                    raise ValueError("Expected %dx%d terrain costs, got %dx%d" % (self.width, self.height, values.width, values.height))
+                lo, hi = values.value_range()
+            else:
+                if len(values) != self.width * self.height:
+                    raise ValueError("Expected %d terrain costs, got %d" % (self.width * self.height, len(values)))
+                lo, hi = (min(values), max(values))
+            if lo < TERRAIN_MIN or hi > TERRAIN_MAX:
+                raise ValueError("Terrain costs not in range %d-%d" % (TERRAIN_MIN, TERRAIN_MAX))
+        if self._chunks is not None:
+            if values is not None and not isinstance(values, CellChunks):
+                values = CellChunks.from_flat(values, self.width, self.height)
+            self._cost_chunks = values
+        else:
+            if isinstance(values, CellChunks):
+                values = values.to_flat()
+            self._costs = values
+        self._dirty = None
+
+    # Check if grid keeps terrain costs, grids without them cost TERRAIN_MIN everywhere
+    @property
+    def has_terrain(self):
+        if self._chunks is not None:
+            return self._cost_chunks is not None
+        return self._costs is not None
+
+    # Moves out of cell by flat index as tuple of (index offset, dx, dy, cost)
+    # Target cells are walkable, the cell itself is not checked
+    def moves(self, idx):
+        if self._masks is None or self._mask_dirty:
+            self.__update_masks()
+        return self._move_table[self._masks[idx]]
+
+    # Move masks of all cells, bit i allows move MOVES[i]
+    def move_masks(self):
+        if self._masks is None or self._mask_dirty:
+            self.__update_masks()
+        return self._masks
+
+    # Compile masks of whole grid, or patch masks around edited cells
+    def __update_masks(self):
+        w, h = (self.width, self.height)
+        if self._masks is None or len(self._mask_dirty) > w * h * MASK_PATCH_LIMIT:
+            self._masks = compile_move_masks(self._types, w, h)
+            self._move_table = move_table(w)
+        else:
+            # Cell is target or corner only of moves from cells next to it
+            walkable = self.walkable
+            for idx in self._mask_dirty:
+                x0, y0 = (idx % w, idx // w)
+                for y in range(max(0, y0 - 1), min(h, y0 + 2)):
+                    for x in range(max(0, x0 - 1), min(w, x0 + 2)):
+                        mask = 0
+                        for bit, (dx, dy, _) in enumerate(MOVES):
+                            if walkable(x + dx, y + dy) and (dx == 0 or dy == 0 or walkable(x + dx, y) or walkable(x, y + dy)):
+                                mask |= 1 << bit
+                        self._masks[y * w + x] = mask
+        self._mask_dirty = set()
+
+    # Indices of cells whose type changed since last call
+    # Returns None if all cells have to be considered changed
+    # Tracking starts on first call so headless use doesn't collect cells
+    def pop_dirty_cells(self):
+        res = self._dirty
+        self._dirty = set()
+        return res
+
+    # Get Cell by flat index
+    def get_cell_by_index(self, idx):
+        return Cell(self, idx % self.width, idx // self.width)
                     
     def find_free_cell(self, direction):
         area = 3
-        x_start = 1 if direction == 1 else self.size - area
-        x_end = area if direction == 1 else self.size - 1
-        y_start = 1 if direction == 1 else self.size - area
-        y_end = area if direction == 1 else self.size - 1
+        x_start = 1 if direction == 1 else self.width - area
+        x_end = area if direction == 1 else self.width - 1
+        y_start = 1 if direction == 1 else self.height - area
+        y_end = area if direction == 1 else self.height - 1
         res = None
-        print(x_start, x_end, y_start, y_end)
+        logger.debug("Searching free cell from x %d-%d y %d-%d", x_start, x_end, y_start, y_end)
         for y in range(y_start, y_end):
             for x in range(x_start, x_end):
                 cell = self.get_cell(x, y)
@@ -271,48 +765,216 @@ class CellGrid:
                     break
         return res
 
-# Save grid as text file
+###############################################################
+#####                    MAP FILES                        #####
+###############################################################
+
+# Text maps: "<width> <height> <cell size>" line followed by one digit per cell, and
+# optionally a line of one terrain cost digit per cell. Square maps can leave out height.
+TXT_SUFFIX = '.txt'
+TXT_DIGITS = bytes.maketrans(bytes(range(10)), b'0123456789')
+TXT_VALUES = bytes.maketrans(b'0123456789', bytes(range(10)))
+
+# Binary maps: fixed size little endian header followed by cell type payload
+#   magic, version, encoding, reserved, width, height, cell size,
+#   start x, start y, end x, end y, payload length, payload crc32,
+#   terrain length, terrain crc32
+# Encoding PACKED_2BIT stores 4 cells per byte, first cell in the lowest bits.
+# Encoding RAW_8BIT stores 1 byte per cell and is mapped into the grid without copying.
+# Encoding CHUNKED stores a table of one byte per CellChunks chunk, the value of a
+# uniform chunk or CHUNK_STORED, followed by CHUNK_CELLS bytes of each stored chunk
+# in table order. Stored chunks are mapped into the grid without copying.
+# Version 2 added terrain costs, 1 byte per cell right after the type payload, or
+# nothing with terrain length 0. CHUNKED maps store terrain costs chunked too.
+# Version 1 headers have zeros in their place.
+MAP_SUFFIX = '.map'
+MAP_MAGIC = b'PFMP'
+MAP_VERSION = 2
+MAP_VERSIONS = (1, 2)
+MAP_HEADER = struct.Struct('<4sHBBIIHIIIIQIQI')
+MAP_HEADER_SIZE = 64  # Header is padded so that payload starts aligned
+PACKED_2BIT = 2
+RAW_8BIT = 8
+CHUNKED = 64
+CHUNK_STORED = 255
+
+# Maps of this many cells or more are saved CHUNKED by save_grid
+CHUNKED_MAP_CELLS = 1024 * 1024
+
+# Translation tables from packed byte to the value of k:th cell in it
+UNPACK_TABLES = [bytes((b >> (2 * k)) & 3 for b in range(256)) for k in range(4)]
+
+
+# Pack cell types with values 0-3 to 2 bits per cell
+def pack_types(types):
+    data = bytes(types)
+    n = len(data)
+    data += bytes(-n % 4)
+    # Every 4th cell goes to the same bit pair, big int ops keep this out of Python loops
+    res = 0
+    for k in range(4):
+        res |= int.from_bytes(data[k::4], 'little') << (2 * k)
+    return res.to_bytes((n + 3) // 4, 'little')
+
+
+# Unpack n cell types from 2 bit payload
+def unpack_types(data, n):
+    res = bytearray(len(data) * 4)
+    for k in range(4):
+        res[k::4] = data.translate(UNPACK_TABLES[k])
+    del res[n:]
+    return res
+
+
+# CHUNKED payload of CellChunks
+def pack_chunks(chunks: CellChunks):
+    table = bytes(c if type(c) is int else CHUNK_STORED for c in chunks.chunks)
+    return table + b''.join(bytes(c) for c in chunks.chunks if type(c) is not int)
+
+
+# CellChunks of CHUNKED payload, stored chunks are slices of data
+def unpack_chunks(data, width, height):
+    res = CellChunks(width, height)
+    n = len(res.chunks)
+    table = bytes(data[:n])
+    if len(table) != n or len(data) != n + table.count(CHUNK_STORED) * CHUNK_CELLS:
+        raise ValueError("Chunked payload doesn't match %dx%d map" % (width, height))
+    pos = n
+    for c, value in enumerate(table):
+        if value == CHUNK_STORED:
+            res.chunks[c] = data[pos:pos + CHUNK_CELLS]
+            pos += CHUNK_CELLS
+        else:
+            res.chunks[c] = value
+    return res
+
+
+# Write grid as binary map file
+def save_map(file_path, grid: CellGrid, encoding=PACKED_2BIT):
+    if encoding == CHUNKED:
+        types, costs = grid.chunks()
+        payload = pack_chunks(types)
+        terrain = pack_chunks(costs) if costs is not None else b''
+    elif encoding in (PACKED_2BIT, RAW_8BIT):
+        payload = pack_types(grid._types) if encoding == PACKED_2BIT else bytes(grid._types)
+        terrain = bytes(grid._costs) if grid.has_terrain else b''
+    else:
+        raise ValueError("Unknown map encoding %d" % encoding)
+    header = MAP_HEADER.pack(MAP_MAGIC, MAP_VERSION, encoding, 0, grid.width, grid.height, grid.cell_size,
+                             grid.start_cell.x, grid.start_cell.y, grid.end_cell.x, grid.end_cell.y,
+                             len(payload), zlib.crc32(payload), len(terrain), zlib.crc32(terrain))
+    with open(file_path, 'wb') as f:
+        f.write(header.ljust(MAP_HEADER_SIZE, b'\0'))
+        f.write(payload)
+        f.write(terrain)
+
+
+# Read grid from binary map file
+# File is memory mapped copy-on-write, so editing the grid never touches the file.
+# RAW_8BIT payload and terrain costs, and CHUNKED stored chunks, are used as grid
+# storage without copying, PACKED_2BIT is unpacked.
+def load_map(file_path, verify=True):
+    with open(file_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(mm) < MAP_HEADER_SIZE:
+        raise ValueError("%s is not a map file" % file_path)
+    (magic, version, encoding, _, width, height, c_size, s_x, s_y, e_x, e_y,
+     p_len, crc, t_len, t_crc) = MAP_HEADER.unpack_from(mm)
+    if magic != MAP_MAGIC:
+        raise ValueError("%s is not a map file" % file_path)
+    if version not in MAP_VERSIONS:
+        raise ValueError("Unsupported map version %d" % version)
+    n = width * height
+    if version == 1:
+        t_len = 0
+    elif t_len not in (0, n) and encoding != CHUNKED:
+        raise ValueError("Expected %d terrain costs, got %d" % (n, t_len))
+    t_start = MAP_HEADER_SIZE + p_len
+    if t_start + t_len > len(mm):
+        raise ValueError("Truncated map file %s" % file_path)
+    payload = memoryview(mm)[MAP_HEADER_SIZE:t_start]
+    terrain = memoryview(mm)[t_start:t_start + t_len] if t_len else None
+    if verify and zlib.crc32(payload) != crc:
+        raise ValueError("Checksum mismatch in %s" % file_path)
+    if verify and terrain is not None and zlib.crc32(terrain) != t_crc:
+        raise ValueError("Terrain checksum mismatch in %s" % file_path)
+    if encoding == PACKED_2BIT:
+        types = unpack_types(mm[MAP_HEADER_SIZE:t_start], n)
+        payload.release()
+        if terrain is not None:
+            costs = bytearray(terrain)
+            terrain.release()
+            terrain = costs
+        mm.close()
+    elif encoding == RAW_8BIT:
+        types = payload
+    elif encoding == CHUNKED:
+        types = unpack_chunks(payload, width, height)
+        if terrain is not None:
+            terrain = unpack_chunks(terrain, width, height)
+    else:
+        raise ValueError("Unknown map encoding %d" % encoding)
+    logger.debug("Read map %s: size %dx%d, cell size %d, encoding %d", file_path, width, height, c_size, encoding)
+    return CellGrid(width, c_size, types, (s_x, s_y), (e_x, e_y), terrain, height)
+
+
+# Write grid as text map file
+def save_txt_map(file_path, grid: CellGrid):
+    with open(file_path, "w") as f:
+        if grid.width == grid.height:
+            f.write("%d %d\n" % (grid.width, grid.cell_size))
+        else:
+            f.write("%d %d %d\n" % (grid.width, grid.height, grid.cell_size))
+        f.write(bytes(grid._types).translate(TXT_DIGITS).decode())
+        if grid.has_terrain:
+            f.write("\n")
+            f.write(bytes(grid._costs).translate(TXT_DIGITS).decode())
+
+
+# Read grid from text map file
+def load_txt_map(file_path):
+    with open(file_path, "rb") as f:
+        size_parts = [int(part) for part in f.readline().split()]
+        if len(size_parts) == 2:
+            width, c_size = size_parts
+            height = width
+        else:
+            width, height, c_size = size_parts
+        logger.debug("Grid size: %dx%d Cell size: %d", width, height, c_size)
+        types = bytearray(f.readline().strip().translate(TXT_VALUES))
+        costs = bytearray(f.readline().strip().translate(TXT_VALUES)) or None
+    return CellGrid(width, c_size, types, costs=costs, height=height)
+
+
+# Convert text map to binary map
+def convert_txt_map(txt_path, map_path, encoding=PACKED_2BIT):
+    save_map(map_path, load_txt_map(txt_path), encoding)
+
+
+# Save grid to maps directory, file type is picked by suffix
 def save_grid(file_name, grid: CellGrid):
     try:
         logger.info("Writing CellGrid to file %s", file_name)
         file_path = MAP_DIRECTORY / file_name
-        if file_path.suffix != '.txt':
+        if file_path.suffix == TXT_SUFFIX:
+            save_txt_map(file_path, grid)
+        elif file_path.suffix == MAP_SUFFIX:
+            save_map(file_path, grid, CHUNKED if grid.width * grid.height >= CHUNKED_MAP_CELLS else PACKED_2BIT)
+        else:
             logger.warning('Incorrect file type: %s', file_path.suffix)
-            return
-        f = open(MAP_DIRECTORY / file_name, "w")
-        f.write("%d %d\n" % (grid.size, grid.cell_size))
-        grid_str = ""
-        for cell in grid:
-            grid_str += str(cell.type.value)
-        f.write(grid_str)
-    except IOError as e:
+    except (IOError, ValueError) as e:
         logger.error("Failed to open %s", file_name)
         logger.exception(e)
-# Reads grid from text file
 
+
+# Read grid from maps directory, file type is picked by suffix
 def load_grid(file_name):
     try:
-        f = open(MAP_DIRECTORY / file_name, "r")
+        file_path = MAP_DIRECTORY / file_name
         logger.debug("Reading Cellgrid from file %s", file_name)
-        size_parts = f.readline().strip().split(' ')
-        g_size = int(size_parts[0])
-        c_size = int(size_parts[1])
-        logger.debug("Grid size: %d Cell size: %d", g_size, c_size)
-        m_grid = CellGrid(g_size, c_size)
-        x = 0
-        y = 0
-        for c in f.readline():
-            cell = Cell(x, y, c_size, CellType(int(c)))
-            m_grid.set_cell(x, y, cell)
-            if cell.type == CellType.START:
-                m_grid.start_cell = cell
-            elif cell.type == CellType.END:
-                m_grid.end_cell = cell
-            x += 1
-            if x == m_grid.size:
-                y += 1
-                x = 0
-        return m_grid
-    except IOError as e:
+        if file_path.suffix == MAP_SUFFIX:
+            return load_map(file_path)
+        return load_txt_map(file_path)
+    except (IOError, ValueError) as e:
         logger.error("Failed to load file %s", file_name)
         logger.exception(e)
@@ -0,0 +1,27 @@
+import argparse
+import logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+from cell_grid import MAP_DIRECTORY, MAP_SUFFIX, PACKED_2BIT, RAW_8BIT, CHUNKED, convert_txt_map
+
+
+# Convert text maps to binary map format
+# Relative paths are looked up from the maps directory
+def main():
+    parser = argparse.ArgumentParser(description='Convert text maps to binary map format')
+    parser.add_argument('maps', nargs='+', help='Text map files to convert')
+    parser.add_argument('--raw', action='store_true', help='Store 1 byte per cell instead of 2 bits, loads without copying')
+    parser.add_argument('--chunked', action='store_true', help='Store only chunks that are not uniform, for large mostly empty maps')
+    args = parser.parse_args()
+
+    encoding = CHUNKED if args.chunked else RAW_8BIT if args.raw else PACKED_2BIT
+    for name in args.maps:
+        txt_path = MAP_DIRECTORY / name
+        map_path = txt_path.with_suffix(MAP_SUFFIX)
+        convert_txt_map(txt_path, map_path, encoding)
+        logger.info("Converted %s to %s", txt_path, map_path)
+
+
+if __name__ == "__main__":
+    main()
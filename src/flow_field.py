@@ -0,0 +1,136 @@
+import numpy as np
+
+from cell_grid import CellGrid, WALL_VALUE, MOVES
+
+# Move directions as (dx, dy) and their costs, same movement model as the pathfinders:
+# diagonal moves need at least one of the two adjacent straight cells free
+DIRECTIONS = tuple((dx, dy) for dx, dy, _ in MOVES)
+COSTS = np.array([cost for _, _, cost in MOVES])
+
+
+# Distance of every cell to a goal cell, computed by wavefront relaxation
+# Whole frontier is relaxed at once with array operations, cells whose distance
+# dropped form the next frontier until nothing changes. Arrays are flat and padded
+# with a wall border, so neighbor indices need no bounds checks.
+class DistanceField:
+    def __init__(self, grid: CellGrid, goal=None):
+        self.width = grid.width
+        self.height = grid.height
+        self.goal = goal if goal is not None else (grid.end_cell.x, grid.end_cell.y)
+        self.stride = self.width + 2  # Row length of padded arrays
+        types = np.frombuffer(grid._types, dtype=np.uint8).reshape(self.height, self.width)
+        self.walkable = np.pad(types != WALL_VALUE, 1).ravel()
+        self.distance = np.full(self.stride * (self.height + 2), np.inf)
+        self.iterations = 0
+        g = self.__index(*self.goal)
+        self.frontier = np.array([], dtype=np.int64)
+        if self.walkable[g]:
+            self.frontier = np.array([g], dtype=np.int64)
+            self.distance[g] = 0.0
+        self.__offsets = [dy * self.stride + dx for dx, dy in DIRECTIONS]
+
+    def __index(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    @property
+    def done(self):
+        return self.frontier.size == 0
+
+    # Relax neighbors of frontier
+    # Returns array of cells (padded flat indices) whose distance dropped
+    def step(self):
+        if self.done:
+            return self.frontier
+        frontier = self.frontier
+        dist = self.distance
+        walkable = self.walkable
+        base = dist[frontier]
+        changed = []
+        for (dx, dy), offset, cost in zip(DIRECTIONS, self.__offsets, COSTS):
+            nbrs = frontier + offset
+            ok = walkable[nbrs]
+            if dx != 0 and dy != 0:
+                ok &= walkable[frontier + dx] | walkable[frontier + dy * self.stride]
+            nbrs = nbrs[ok]
+            new = base[ok] + cost
+            better = new < dist[nbrs]
+            nbrs = nbrs[better]
+            # Several frontier cells can lower the same neighbor, minimum.at keeps the lowest
+            np.minimum.at(dist, nbrs, new[better])
+            changed.append(nbrs)
+        self.frontier = np.unique(np.concatenate(changed))
+        self.iterations += 1
+        return self.frontier
+
+    def compute(self):
+        while not self.done:
+            self.step()
+        return self
+
+    # Distances as height x width array indexed [y, x], inf where goal can't be reached
+    def grid_distances(self):
+        return self.distance.reshape(self.height + 2, self.stride)[1:-1, 1:-1]
+
+    def distance_at(self, x, y):
+        return self.distance[self.__index(x, y)]
+
+    # Convert padded flat indices to grid (x, y) arrays
+    def coordinates(self, indices):
+        return (indices % self.stride - 1, indices // self.stride - 1)
+
+
+# Flow field from distance field
+# Each cell gets the index in DIRECTIONS of its next step towards the goal,
+# -1 for the goal, walls and cells that can't reach it.
+def flow_directions(field: DistanceField):
+    w = field.stride
+    h = field.height + 2
+    dist = field.distance.reshape(h, w)
+    walkable = field.walkable.reshape(h, w)
+    inner = (slice(1, -1), slice(1, -1))
+    best = np.full((field.height, field.width), np.inf)
+    res = np.full((field.height, field.width), -1, dtype=np.int8)
+    for i, ((dx, dy), cost) in enumerate(zip(DIRECTIONS, COSTS)):
+        shifted = (slice(1 + dy, h - 1 + dy), slice(1 + dx, w - 1 + dx))
+        cand = dist[shifted] + cost
+        ok = walkable[shifted].copy()
+        if dx != 0 and dy != 0:
+            ok &= walkable[1:-1, 1 + dx:w - 1 + dx] | walkable[1 + dy:h - 1 + dy, 1:-1]
+        cand[~ok] = np.inf
+        better = cand < best
+        best[better] = cand[better]
+        res[better] = i
+    own = dist[inner]
+    res[~walkable[inner] | ~np.isfinite(own) | (own == 0.0)] = -1
+    return res
+
+
+# Distance and flow fields to a single goal, end cell by default
+# Any number of units can read their next step towards the goal in constant time.
+# Distance field that was already computed step by step can be given as field.
+class FlowField:
+    def __init__(self, grid: CellGrid, goal=None, field=None):
+        self.field = field if field is not None else DistanceField(grid, goal).compute()
+        self.directions = flow_directions(self.field)
+        self.goal = self.field.goal
+
+    def distance(self, x, y):
+        return self.field.distance_at(x, y)
+
+    # Next cell (x, y) towards goal or None if at goal or goal can't be reached
+    def next_cell(self, x, y):
+        d = self.directions[y, x]
+        if d < 0:
+            return None
+        dx, dy = DIRECTIONS[d]
+        return (x + dx, y + dy)
+
+    # Cells from x, y to goal, empty if goal can't be reached
+    def path(self, x, y):
+        if not np.isfinite(self.distance(x, y)):
+            return []
+        res = [(x, y)]
+        while (x, y) != self.goal:
+            x, y = self.next_cell(x, y)
+            res.append((x, y))
+        return res
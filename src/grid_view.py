@@ -0,0 +1,381 @@
+import logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+import numpy as np
+import pygame
+
+from camera import GridCamera
+from cell_grid import CellGrid, CellType, CELL_TYPES, FLOOR_VALUE, TERRAIN_MIN, TERRAIN_MAX
+
+CELL_COLORS = {
+    CellType.WALL: (0, 0, 0),
+    CellType.FLOOR: (50, 180, 180),
+    CellType.START: (200, 40, 40),
+    CellType.END: (40, 250, 40)
+}
+
+# Cell colors by type value
+TYPE_COLORS = [CELL_COLORS[t] for t in CELL_TYPES]
+
+# Floor colors by terrain cost, fading from floor color to mud at TERRAIN_MAX
+MUD_COLOR = (110, 80, 30)
+TERRAIN_COLORS = [tuple(round(f + (m - f) * (c - TERRAIN_MIN) / (TERRAIN_MAX - TERRAIN_MIN))
+                        for f, m in zip(CELL_COLORS[CellType.FLOOR], MUD_COLOR))
+                  for c in range(TERRAIN_MAX + 1)]
+
+# Palette index of cell is state << (TYPE_BITS + COST_BITS) | type << COST_BITS | terrain cost
+TYPE_BITS = 2
+COST_BITS = 4
+
+# Terrain cost painted with the terrain key
+TERRAIN_BRUSH = 5
+
+# Above this many changed cells the whole viewport is pushed to display instead of single rects
+MAX_DIRTY_RECTS = 512
+
+# Cell cache is rendered in square tiles of TILE_SIZE cells when they become visible
+TILE_SIZE = 64
+
+# Zoom levels where the whole grid fits in MAX_SCALED_SIZE pixels keep a pre-scaled surface
+MAX_SCALED_SIZE = 4096
+
+
+# Pygame adapter for CellGrid
+# Handles rendering, mouse and keyboard editing and camera, so that CellGrid
+# and solvers stay free of display dependencies.
+# Grid and solver overlay are rendered to cached tile pixel arrays with one pixel
+# per cell, only cells changed by edits and solver steps are redrawn each frame.
+# Tiles are rendered when they come into view by mapping cell types, terrain and
+# solver states through a palette with numpy, and the visible part is scaled to the
+# camera zoom and pushed to the display with surfarray in one blit, so render cost
+# and cache memory depend on the viewed area instead of grid size. Viewport is
+# view_width x view_height pixels, square if only width is given and the whole grid
+# if neither is.
+class GridView:
+    def __init__(self, grid: CellGrid, view_width=None, view_height=None):
+        self.grid = grid
+        if not view_width:
+            view_width, view_height = (grid.width * grid.cell_size, grid.height * grid.cell_size)
+        self.view_width = view_width
+        self.view_height = view_height if view_height else view_width
+        self.camera = GridCamera(0, 0, self.view_width, self.view_height)
+        self.__tiles = {}  # Tile index -> cached tile surface of grid with solver overlay
+        self.__scaled = {}  # Pixels per cell -> (pre-scaled cached surface, valid tiles)
+        self.__view = None  # Camera (x, y, scale) of last presented frame
+        self.__solver = None  # Solver drawn on cached surface
+        self.__volatile = {}  # Cell -> color of volatile solver overlay on cached surface
+        self.__palette = None  # Mapped pixel values of colors, see __build_palette
+        self.__redraw = True
+
+    # Show another grid, camera is kept with keep_camera if the grid has the same size
+    def set_grid(self, grid: CellGrid, keep_camera=False):
+        if not keep_camera or (grid.width, grid.height) != (self.grid.width, self.grid.height):
+            self.camera = GridCamera(0, 0, self.view_width, self.view_height)
+        self.grid = grid
+        self.invalidate()
+
+    # Redraw whole grid on next show
+    def invalidate(self):
+        self.__redraw = True
+
+    # Edit maze
+    # Returns edited cell or None
+    def edit(self):
+        m_x, m_y = pygame.mouse.get_pos()
+        c_x, c_y = self.cell_index(m_x, m_y)
+        res = None
+        if not self.grid.in_bounds(c_x, c_y, 1):
+            return res
+        if not self.camera.in_bounds(m_x, m_y):
+            return res
+
+        #logger.info("m_xy (%d, %d) cxy (%d, %d)", m_x, m_y, c_x, c_y)
+        keys_pressed = pygame.key.get_pressed()
+
+        if keys_pressed[pygame.K_s]:
+            self.grid.set_cell_type(c_x, c_y, CellType.START)
+            logger.debug("Set START cell to (%d, %d)", c_x, c_y)
+            res = self.grid.get_cell(c_x, c_y)
+        elif keys_pressed[pygame.K_e]:
+            self.grid.set_cell_type(c_x, c_y, CellType.END)
+            logger.debug("Set END cell to (%d, %d)", c_x, c_y)
+            res = self.grid.get_cell(c_x, c_y)
+        elif keys_pressed[pygame.K_w]:
+            if self.grid.set_cell_type(c_x, c_y, CellType.WALL):
+                logger.debug('Dont overwrite start or end!')
+            else:
+                logger.debug("Edit cell (%d, %d) type to WALL", c_x, c_y)
+            res = self.grid.get_cell(c_x, c_y)
+        elif keys_pressed[pygame.K_f]:
+            if self.grid.set_cell_type(c_x, c_y, CellType.FLOOR):
+                logger.debug('Dont overwrite start or end!')
+            else:
+                logger.debug("Edit cell (%d, %d) type to FLOOR", c_x, c_y)
+            res = self.grid.get_cell(c_x, c_y)
+            self.grid.set_cell_type(c_x, c_y, CellType.FLOOR)
+            logger.debug("Edit cell (%d, %d) type to WALL", c_x, c_y)
+            res = self.grid.get_cell(c_x, c_y)
+            self.grid.set_cost(c_x, c_y, TERRAIN_MIN)
+        elif keys_pressed[pygame.K_t]:
+            self.grid.set_cost(c_x, c_y, TERRAIN_BRUSH)
+            logger.debug("Edit cell (%d, %d) terrain cost to %d", c_x, c_y, TERRAIN_BRUSH)
+            res = self.grid.get_cell(c_x, c_y)
+
+        return res
+
+    # Should be called after every zoom/drag operation
+    def __clip_camera(self):
+        p = self.grid.cell_size * self.camera.current_scale
+        newx = min(max(0, self.grid.width * p - self.camera.width), max(0, self.camera.x))
+        newy = min(max(0, self.grid.height * p - self.camera.height), max(0, self.camera.y))
+        self.camera.x = newx
+        self.camera.y = newy
+
+    def drag_grid(self):
+        cx = self.camera.x - self.camera.drag_x
+        cy = self.camera.y - self.camera.drag_y
+        self.camera.x = cx
+        self.camera.y = cy
+        self.__clip_camera()
+        logger.debug("Dragging grid - nxy (%f, %f) dxy (%f, %f)", cx, cy, self.camera.drag_x, self.camera.drag_y)
+        self.camera.drag_x = 0
+        self.camera.drag_y = 0
+
+    def zoom_grid(self, mx, my, zoom_in):
+        self.camera.zoom(mx, my, zoom_in)
+        self.__clip_camera()
+        logger.debug("Zooming grid - Mouse pos: (%d, %d), size: (%d), x_off: (%f), y_off: (%f) cur_scale: (%f), zoom_upd (%f)",
+                    mx, my, self.camera.width,
+                    self.camera.x, self.camera.y,
+                    self.camera.current_scale,
+                    zoom_in)
+
+    # Returns grid indices from mouse position
+    def cell_index(self, m_x, m_y):
+        m_x, m_y = self.camera.screen_to_grid(m_x, m_y)
+        c_x = int(m_x / self.grid.cell_size)
+        c_y = int(m_y / self.grid.cell_size)
+        #logger.debug("Calling cell_index: mx, my (%f, %f) cx, cy (%d, %d)", m_x, m_y, c_x, c_y)
+        return (c_x, c_y)
+
+    # Draw changed cells of camera viewport to surface
+    # Solver overlay is drawn on top of grid if solver is given
+    # Returns list of updated rects in surface
+    def show(self, surface, solver=None):
+        if solver is not self.__solver:
+            self.__solver = solver
+            self.__redraw = True
+
+        grid_dirty = self.grid.pop_dirty_cells()
+        solver_dirty = solver.pop_dirty_cells() if solver is not None else set()
+        volatile = self.__get_volatile(solver)
+
+        if self.__redraw or grid_dirty is None or solver_dirty is None:
+            # Tiles are rendered again when they are visible
+            self.__redraw = False
+            self.__tiles = {}
+            self.__scaled = {}
+            self.__view = None
+            self.__volatile = volatile
+            self.__palette = self.__build_palette(surface, solver)
+            cells = ()
+        else:
+            cells = set(solver_dirty)
+            cells.update(self.grid.get_cell_by_index(idx) for idx in grid_dirty)
+            # Volatile overlay cells that moved or changed color
+            for cell, color in self.__volatile.items():
+                if volatile.get(cell) != color:
+                    cells.add(cell)
+            for cell, color in volatile.items():
+                if self.__volatile.get(cell) != color:
+                    cells.add(cell)
+            self.__volatile = volatile
+
+        cam = self.camera
+        p = self.grid.cell_size * cam.current_scale
+        view = (int(cam.x), int(cam.y), cam.current_scale)
+        view_rect = pygame.Rect(0, 0, cam.width, cam.height)
+        if self.__validate_tiles(surface, p, view[0], view[1], solver):
+            self.__view = None
+
+        # Update changed cells to caches and to viewport if camera stayed in place
+        rects = []
+        for cell in cells:
+            t = self.__tile_index(cell.x, cell.y)
+            tile = self.__tiles.get(t)
+            if tile is None:
+                continue
+            color = self.__get_color(cell, solver)
+            tile[cell.y % TILE_SIZE, cell.x % TILE_SIZE] = surface.map_rgb(color)
+            for sp, (scaled, s_tiles) in self.__scaled.items():
+                if s_tiles[t]:
+                    scaled.fill(color, (cell.x * sp, cell.y * sp, sp, sp))
+            if self.__view == view:
+                rect = pygame.Rect(cell.x * p - view[0], cell.y * p - view[1], p, p).clip(view_rect)
+                if rect.width > 0 and rect.height > 0:
+                    surface.fill(color, rect)
+                    rects.append(rect)
+
+        if self.__view != view or len(rects) > MAX_DIRTY_RECTS:
+            self.__view = view
+            self.__blit_view(surface, p, view[0], view[1])
+            return [view_rect]
+        #logger.info("rendered %d cells", len(rects))
+        return rects
+
+    def __tile_columns(self):
+        return (self.grid.width + TILE_SIZE - 1) // TILE_SIZE
+
+    def __tile_index(self, x, y):
+        return (y // TILE_SIZE) * self.__tile_columns() + x // TILE_SIZE
+
+    # Range of tiles in camera viewport
+    def __visible_tiles(self, p, cam_x, cam_y):
+        tp = TILE_SIZE * p
+        tx0 = max(0, cam_x // tp)
+        ty0 = max(0, cam_y // tp)
+        tx1 = min(self.__tile_columns(), (cam_x + self.camera.width + tp - 1) // tp)
+        ty1 = min((self.grid.height + TILE_SIZE - 1) // TILE_SIZE, (cam_y + self.camera.height + tp - 1) // tp)
+        return tx0, ty0, tx1, ty1
+
+    # Cell rectangle (x0, y0, x1, y1) of tile
+    def __tile_bounds(self, t):
+        ty, tx = divmod(t, self.__tile_columns())
+        x0, y0 = (tx * TILE_SIZE, ty * TILE_SIZE)
+        return (x0, y0, min(self.grid.width, x0 + TILE_SIZE), min(self.grid.height, y0 + TILE_SIZE))
+
+    # Render visible tiles that are not cached yet
+    # Returns True if any tile was rendered
+    def __validate_tiles(self, surface, p, cam_x, cam_y, solver):
+        res = False
+        w, h = (self.grid.width, self.grid.height)
+        scaled = None
+        if w * p <= MAX_SCALED_SIZE and h * p <= MAX_SCALED_SIZE:
+            if p not in self.__scaled:
+                n = self.__tile_columns() * ((h + TILE_SIZE - 1) // TILE_SIZE)
+                self.__scaled[p] = (pygame.Surface((w * p, h * p), 0, surface), bytearray(n))
+            scaled = self.__scaled[p]
+        tx0, ty0, tx1, ty1 = self.__visible_tiles(p, cam_x, cam_y)
+        columns = self.__tile_columns()
+        missing = [ty * columns + tx for ty in range(ty0, ty1) for tx in range(tx0, tx1)
+                   if ty * columns + tx not in self.__tiles]
+        if missing:
+            self.__render_tiles(surface, missing, solver)
+            res = True
+        if scaled is not None:
+            # Visible cells are scaled to cached surface in one blit when any of their tiles isn't
+            s_tiles = scaled[1]
+            if not all(s_tiles[ty * columns + tx] for ty in range(ty0, ty1) for tx in range(tx0, tx1)):
+                x0, y0 = (tx0 * TILE_SIZE, ty0 * TILE_SIZE)
+                x1, y1 = (min(w, tx1 * TILE_SIZE), min(h, ty1 * TILE_SIZE))
+                pixels = self.__scale_pixels(self.__cell_pixels(x0, y0, x1, y1), p)
+                scaled[0].blit(self.__pixel_surface(surface, pixels), (x0 * p, y0 * p))
+                for ty in range(ty0, ty1):
+                    s_tiles[ty * columns + tx0:ty * columns + tx1] = b'\x01' * (tx1 - tx0)
+                res = True
+        return res
+
+    # Mapped pixel values for surface format, indexed by palette index of cell
+    # Solver state colors cover type colors, floor is colored by terrain cost.
+    def __build_palette(self, surface, solver):
+        type_colors = np.empty((len(TYPE_COLORS), 1 << COST_BITS), np.uint32)
+        for t, color in enumerate(TYPE_COLORS):
+            type_colors[t] = surface.map_rgb(color)
+        for c, color in enumerate(TERRAIN_COLORS):
+            type_colors[FLOOR_VALUE, c] = surface.map_rgb(color)
+        res = np.empty((256, type_colors.size), np.uint32)
+        res[:] = type_colors.ravel()
+        if solver is not None:
+            for state, color in enumerate(solver.STATE_COLORS):
+                if color is not None:
+                    res[state] = surface.map_rgb(color)
+        return res.ravel()
+
+    # Render tiles to pixel arrays in format of surface with one pixel per cell, indexed
+    # [y, x] in row order of surface memory.
+    # The bounding cell range is mapped through the palette at once, from type, terrain
+    # and solver state arrays without cell views. Types are read by region, so packed
+    # grids stay packed.
+    def __render_tiles(self, surface, tiles, solver):
+        bounds = [self.__tile_bounds(t) for t in tiles]
+        x0, y0 = (min(b[0] for b in bounds), min(b[1] for b in bounds))
+        x1, y1 = (max(b[2] for b in bounds), max(b[3] for b in bounds))
+        index = self.grid.type_region(x0, y0, x1, y1).astype(np.uint16)
+        if solver is not None:
+            states = np.frombuffer(solver.states, np.uint8).reshape(self.grid.height, self.grid.width)
+            index |= states[y0:y1, x0:x1].astype(np.uint16) << TYPE_BITS
+        index <<= COST_BITS
+        costs = self.grid.cost_region(x0, y0, x1, y1)
+        index |= costs if costs is not None else TERRAIN_MIN
+        pixels = np.take(self.__palette, index)
+        for cell, color in self.__volatile.items():
+            if x0 <= cell.x < x1 and y0 <= cell.y < y1:
+                pixels[cell.y - y0, cell.x - x0] = surface.map_rgb(color)
+        for t, (tx0, ty0, tx1, ty1) in zip(tiles, bounds):
+            self.__tiles[t] = pixels[ty0 - y0:ty1 - y0, tx0 - x0:tx1 - x0].copy()
+
+    # Pixel array of cells in range from cached tiles, tiles of the range have to be rendered
+    def __cell_pixels(self, x0, y0, x1, y1):
+        res = np.empty((y1 - y0, x1 - x0), np.uint32)
+        columns = self.__tile_columns()
+        for ty in range(y0 // TILE_SIZE, (y1 - 1) // TILE_SIZE + 1):
+            for tx in range(x0 // TILE_SIZE, (x1 - 1) // TILE_SIZE + 1):
+                tile = self.__tiles[ty * columns + tx]
+                base_x, base_y = (tx * TILE_SIZE, ty * TILE_SIZE)
+                sx0, sy0 = (max(x0, base_x), max(y0, base_y))
+                sx1, sy1 = (min(x1, base_x + TILE_SIZE), min(y1, base_y + TILE_SIZE))
+                res[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = tile[sy0 - base_y:sy1 - base_y, sx0 - base_x:sx1 - base_x]
+        return res
+
+    # Pixel array scaled to p pixels per cell
+    # Pixels are repeated instead of pygame.transform.scale, which is not exact at
+    # cell borders for large scales.
+    @staticmethod
+    def __scale_pixels(pixels, p):
+        if p == 1:
+            return pixels
+        return np.repeat(np.repeat(pixels, p, axis=0), p, axis=1)
+
+    # New surface in format of surface with pixels of [y, x] array
+    @staticmethod
+    def __pixel_surface(surface, pixels):
+        res = pygame.Surface((pixels.shape[1], pixels.shape[0]), 0, surface)
+        pygame.surfarray.blit_array(res, pixels.T)
+        return res
+
+    # Blit whole camera viewport to surface
+    def __blit_view(self, surface, p, cam_x, cam_y):
+        view_rect = pygame.Rect(0, 0, self.camera.width, self.camera.height)
+        if p in self.__scaled:
+            surface.blit(self.__scaled[p][0], (0, 0), pygame.Rect(cam_x, cam_y, view_rect.width, view_rect.height))
+            return
+        # Scale only visible cell range and push it in one blit
+        x0 = max(0, cam_x // p)
+        y0 = max(0, cam_y // p)
+        x1 = min(self.grid.width, (cam_x + view_rect.width + p - 1) // p)
+        y1 = min(self.grid.height, (cam_y + view_rect.height + p - 1) // p)
+        pixels = self.__scale_pixels(self.__cell_pixels(x0, y0, x1, y1), p)
+        off_x, off_y = (cam_x - x0 * p, cam_y - y0 * p)
+        pixels = pixels[off_y:off_y + view_rect.height, off_x:off_x + view_rect.width]
+        surface.blit(self.__pixel_surface(surface, pixels), (0, 0))
+
+    # Cell -> color of solver overlay that is rebuilt every frame
+    def __get_volatile(self, solver):
+        res = {}
+        if solver is None:
+            return res
+        for color, cells in solver.get_volatile_overlay():
+            for c in cells:
+                res[c] = color if color else CELL_COLORS[c.type]
+        return res
+
+    # Final color of cell on cached surface
+    def __get_color(self, cell, solver):
+        color = self.__volatile.get(cell)
+        if color is None and solver is not None:
+            color = solver.STATE_COLORS[solver.states[cell._idx]]
+        if color is None:
+            t = self.grid.get_cell_type(cell.x, cell.y).value
+            color = TERRAIN_COLORS[self.grid.get_cost(cell.x, cell.y)] if t == FLOOR_VALUE else TYPE_COLORS[t]
+        return color
@@ -1,3 +1,4 @@
+import argparse
 import time
 import logging
 logger = logging.getLogger(__name__)
@@ -7,8 +8,12 @@ import pygame
 import pygame_gui
 
 from cell_grid import CellGrid, CellType, save_grid, load_grid
+from grid_view import GridView
 import solver as slvr
 from my_gui import MyGui
+from step_scheduler import StepScheduler
+from solve_worker import SolveWorker
+from solver_stats import save_stats
 
 
 UPDATE_MODES = [
@@ -24,8 +29,13 @@ WINDOW_HEIGHT = 768
 GRID_SIZE = 768
 GUI_WIDTH = 256
 
+# Seconds between progress and solver stats updates in info panel
+PROGRESS_REFRESH = 0.25
+
+# Grid is grid_width x grid_height cells, square if height is not given, or the map
+# map_name from the maps directory
 class MainApp():
-    def __init__(self):
+    def __init__(self, grid_width=64, grid_height=None, cell_size=12, map_name=None):
         pygame.init()
         
         self.clock = pygame.time.Clock()
@@ -38,12 +48,22 @@ class MainApp():
         self.gui = MyGui(GRID_SIZE, 0, GUI_WIDTH, WINDOW_HEIGHT, self.current_update_mode)
         self.running = False
 
-        self.cell_grid = CellGrid(64, 12)
+        self.cell_grid = load_grid(map_name) if map_name else None
+        if self.cell_grid is None:
+            self.cell_grid = CellGrid(grid_width, cell_size, height=grid_height)
+        self.grid_view = GridView(self.cell_grid, GRID_SIZE, WINDOW_HEIGHT)
+        # Solver is reset when a solving mode is picked
         self.solver: slvr.Solver = slvr.SOLVERS['Astar']('Astar', self.cell_grid)
-        self.solver.reset(self.cell_grid)
+        # Steps of Continous mode within frame time budget
+        self.scheduler = StepScheduler(speed=self.gui.update_speed())
+        # Background solve of Instant mode, and when its progress was last shown
+        self.__worker: SolveWorker = None
+        self.__progress_time = 0.0
+        self.__stats_time = 0.0  # When solver stats were last shown
 
         self.edit = False
         self.__step = False
+        self.__full_update = True  # Redraw background and update whole window on next show
 
     def run(self):
         fps = 0
@@ -85,6 +105,19 @@ class MainApp():
 
         if event.type == pygame.QUIT:
             self.running = False
+
+        elif event.type == pygame.VIDEOEXPOSE:
+            self.__full_update = True
+
+        # Mouse events, wheel zooms and right button drags grid
+        elif event.type == pygame.MOUSEWHEEL:
+            m_x, m_y = pygame.mouse.get_pos()
+            self.grid_view.zoom_grid(m_x, m_y, event.y > 0)
+
+        elif event.type == pygame.MOUSEMOTION:
+            if event.buttons[2] and self.grid_view.camera.in_bounds(*event.pos):
+                self.grid_view.camera.update_drag(*event.rel)
+                self.grid_view.drag_grid()
         
         # Keyboard events
         elif event.type == pygame.KEYDOWN:
@@ -94,9 +127,14 @@ class MainApp():
             elif event.key == pygame.K_SPACE:
                 self.__step = True
 
+            elif event.key == pygame.K_x:
+                solver = self.__worker.solver if self.__worker is not None else self.solver
+                save_stats(solver.run_stats())
+
             elif event.key == pygame.K_r:
+                self.__cancel_worker()
                 self.cell_grid.reset_cells()
-                self.solver.reset(self.cell_grid)
+                self.__restart_solver()
 
             elif event.key == pygame.K_1:
                 self.set_update_mode('Edit')
@@ -125,6 +163,9 @@ class MainApp():
             print('Resetting solver to: ', event.text)
             self.reset_solver(event.text)
 
+        elif event.type == pygame_gui.UI_HORIZONTAL_SLIDER_MOVED and self.gui.is_speed_slider(event.ui_element):
+            self.scheduler.speed = self.gui.update_speed()
+
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
             # Write grid to text file
             if event.ui_element.text == "Save":
@@ -136,53 +177,67 @@ class MainApp():
                 fname = self.gui.get_file_name()
                 cg = load_grid(fname)
                 if cg != None:
+                    self.__cancel_worker()
                     self.cell_grid = cg
-                    self.solver.reset(self.cell_grid)
+                    self.grid_view.set_grid(self.cell_grid)
+                    self.__full_update = True
+                    self.__restart_solver()
                 else:
                     logger.warn("Failed to load cell grid from file %s", fname)
 
         self.gui.process_event(event)
 
     def update(self, time_delta):
-        #if self.cell_grid.camera.dragging:
-        #    self.cell_grid.drag_grid()
         if self.gui.active_text_box():
             pass
 
         elif self.current_update_mode == 'Edit':
-            self.cell_grid.edit()
+            self.grid_view.edit()
 
         elif self.current_update_mode == 'Step':
-            ed_cell = self.cell_grid.edit()
-            if ed_cell != None and self.solver.cell_in_use(ed_cell):
-                self.solver.reset(self.cell_grid)
+            ed_cell = self.grid_view.edit()
+            if ed_cell != None and self.solver.cell_edited(ed_cell):
                 self.gui.update_infobox_path(0)
 
             if self.__step:
                 if not self.solver.solved:
+                    t = time.perf_counter()
                     self.solver.solve_step()
+                    self.solver.stats.add_steps(1, time.perf_counter() - t)
                     self.__step = False
 
         elif self.current_update_mode == 'Continous':
-            ed_cell = self.cell_grid.edit()
-            if ed_cell != None and self.solver.cell_in_use(ed_cell):
-                self.solver.reset(self.cell_grid)
+            ed_cell = self.grid_view.edit()
+            if ed_cell != None and self.solver.cell_edited(ed_cell):
                 self.gui.update_infobox_path(0)
             
-            if not self.solver.solved and not self.solver.no_path:
-                self.solver.solve_step()
+            self.scheduler.run(self.solver)
 
         elif self.current_update_mode == 'Instant':
-            ed_cell = self.cell_grid.edit()
-            if ed_cell != None and self.solver.cell_in_use(ed_cell):
-                self.solver.reset(self.cell_grid)
-                self.gui.update_infobox_path(0)
-            if not self.solver.solved and not self.solver.no_path:
-                self.solver.solve_all()
+            ed_cell = self.grid_view.edit()
+            if self.__worker is not None:
+                if ed_cell != None and self.__worker.cell_edited(self.cell_grid, ed_cell):
+                    self.__worker = None
+                    self.solver.reset(self.cell_grid)
+                    self.gui.update_infobox_path(0)
+                else:
+                    self.__poll_worker()
+            else:
+                if ed_cell != None and self.solver.cell_edited(ed_cell):
+                    self.gui.update_infobox_path(0)
+                # Solving runs in background, window keeps responding and edits can cancel it
+                if not self.solver.solved and not self.solver.no_path:
+                    self.__worker = SolveWorker(self.solver.name, self.cell_grid).start()
+                    self.__progress_time = time.time()
 
         else:
             logger.info('Unrecognized mode: %s', self.current_update_mode)
 
+        if self.current_update_mode != 'Edit' and time.time() - self.__stats_time >= PROGRESS_REFRESH:
+            self.__stats_time = time.time()
+            solver = self.__worker.solver if self.__worker is not None else self.solver
+            self.gui.update_infobox_stats(solver.get_stats())
+
         path_len = 0
         if self.solver.name in slvr.PATHFINDERS and self.solver.solved:
             path_len = len(self.solver.get_path())
@@ -190,39 +245,86 @@ class MainApp():
         self.gui.update(time_delta, path_len)
 
     def show(self):
-        self.root_window.blit(self.background_surface, (0, 0))
+        if self.__full_update:
+            self.root_window.blit(self.background_surface, (0, 0))
+            self.grid_view.invalidate()
         #c1 = time.time()
-        self.cell_grid.show(self.root_window, self.solver.get_cells_in_use())
+        # Solver overlay is not drawn in edit mode
+        solver = self.solver if self.current_update_mode != 'Edit' else None
+        rects = self.grid_view.show(self.root_window, solver)
         #c2 = time.time()
         #grid_time = c2 - c1
-        if self.current_update_mode != 'Edit':
-            self.solver.show(self.root_window)
-        #c3 = time.time()
-        #solver_time = c3 - c2
         self.gui.show(self.root_window)
-        #c4 = time.time()
-        #gui_time = c4 - c3
-        #logger.info('grid: %.4f, solver: %.4f, gui: %.4f', grid_time, solver_time, gui_time)
-        pygame.display.update()
+        #c3 = time.time()
+        #gui_time = c3 - c2
+        #logger.info('grid: %.4f, gui: %.4f', grid_time, gui_time)
+        if self.__full_update:
+            self.__full_update = False
+            pygame.display.update()
+        else:
+            pygame.display.update(rects + [self.gui.rect])
+
+    # Show progress of background solve, or take over its grid and solver when done
+    def __poll_worker(self):
+        worker = self.__worker
+        if not worker.done:
+            if time.time() - self.__progress_time >= PROGRESS_REFRESH:
+                self.__progress_time = time.time()
+                self.gui.update_infobox_progress(worker.progress)
+            return
+        self.__worker = None
+        self.cell_grid = worker.result_grid(self.cell_grid)
+        self.grid_view.set_grid(self.cell_grid, keep_camera=True)
+        self.solver = worker.solver
+        self.gui.update_infobox_progress(worker.progress)
+        if worker.error is not None:
+            # Don't start failing solve again on next frame
+            self.solver.no_path = True
+
+    def __cancel_worker(self):
+        if self.__worker is not None:
+            self.__worker.cancel()
+            self.__worker = None
+
+    # Start solving over
+    # Path finders wait for a solving mode, so editing a large map doesn't allocate
+    # their search arrays. Generators clear the grid right away.
+    def __restart_solver(self):
+        if self.current_update_mode != 'Edit' or self.solver.name not in slvr.PATHFINDERS:
+            self.solver.reset(self.cell_grid)
 
     def set_update_mode(self, u_mode):
+        self.__cancel_worker()
         self.current_update_mode = u_mode
-        self.solver.reset(self.cell_grid)
+        if u_mode == 'Edit':
+            # Flat arrays of solving are freed while editing, large maps keep only their content
+            self.cell_grid.compact()
+        self.__restart_solver()
+        self.scheduler.reset()
 
     def reset_solver(self, solver_name):
         if solver_name not in slvr.SOLVERS:
             return
+        self.__cancel_worker()
         self.solver = slvr.SOLVERS[solver_name](solver_name, self.cell_grid)
         if solver_name in slvr.PATHFINDERS:
             c1 = self.cell_grid.find_free_cell(1)
             c2 = self.cell_grid.find_free_cell(-1)
             self.cell_grid.set_cell_type(c1.x, c1.y, CellType.START)
             self.cell_grid.set_cell_type(c2.x, c2.y, CellType.END)
-        self.solver.reset(self.cell_grid)
+        self.__restart_solver()
+        self.scheduler.reset()
 
 
 def main():
-    my_app = MainApp()
+    parser = argparse.ArgumentParser(description='Pathfinding and maze generation visualizer')
+    parser.add_argument('--width', type=int, default=64, help='Grid width in cells')
+    parser.add_argument('--height', type=int, help='Grid height in cells, same as width if not given')
+    parser.add_argument('--cell-size', type=int, default=12, help='Cell size in pixels')
+    parser.add_argument('--map', help='Map file to open from maps directory')
+    args = parser.parse_args()
+
+    my_app = MainApp(args.width, args.height, args.cell_size, args.map)
     my_app.run()
 
 
@@ -6,21 +6,28 @@ from pygame_gui.elements.ui_text_box import UITextBox
 from pygame_gui.elements.ui_drop_down_menu import UIDropDownMenu
 from pygame_gui.elements.ui_text_entry_box import UITextEntryBox
 from pygame_gui.elements.ui_text_entry_line import UITextEntryLine
+from pygame_gui.elements.ui_horizontal_slider import UIHorizontalSlider
+from pygame_gui.elements.ui_label import UILabel
 
 from solver import SOLVERS
 
-def build_info_text(mode, path_text):
+def build_info_text(mode, path_text, stats_text=''):
     res = (
         'Pathfinder<br>'
         f'Current mode: {mode}<br>'
         f'{path_text}<br>'
+        f'{stats_text}'
         'Keybinds<br>'
         'Key W: Add wall<br>'
         'Key F: Add floor<br>'
+        'Key T: Add rough terrain<br>'
         'Key S: Move start<br>'
         'Key E: Move end<br>'
         'Key R: Reset grid<br>'
         'Key Space: Solve 1 step<br>'
+        'Key X: Export solver stats<br>'
+        'Mouse wheel: Zoom<br>'
+        'Right drag: Move grid<br>'
         'Key Esc: Exit<br><br>'
         'Update modes:<br>'
         'Key 1: Editor<br>'
@@ -43,21 +50,38 @@ class InfoPanel():
         self.rect = pygame.Rect(x, y, width, height)
         self.current_mode = update_mode
         self.path_text = ''
-        info_text = build_info_text(self.current_mode, self.path_text)
+        self.stats_text = ''
+        info_text = build_info_text(self.current_mode, self.path_text, self.stats_text)
         self.text_box = UITextBox(info_text, self.rect, manager=self.gui_manager)
 
-    def update_mode_text(self, mode):
-        self.current_mode = mode
-        info_text = build_info_text(self.current_mode, self.path_text)
+    def __rebuild(self):
         self.text_box.kill()
+        info_text = build_info_text(self.current_mode, self.path_text, self.stats_text)
         self.text_box = UITextBox(info_text, self.rect, manager=self.gui_manager)
 
+    def update_mode_text(self, mode):
+        self.current_mode = mode
+        self.__rebuild()
+
     def update_path_text(self, path_len):
         path_text = f'Path length: {path_len}' if path_len else ''
         self.path_text = path_text
-        self.text_box.kill()
-        info_text = build_info_text(self.current_mode, path_text)
-        self.text_box = UITextBox(info_text, self.rect, manager=self.gui_manager)
+        self.__rebuild()
+
+    def update_progress_text(self, progress):
+        self.path_text = f'Solving: {progress.steps} steps, {progress.frontier} queued, {progress.seconds:.1f} s'
+        self.__rebuild()
+
+    def update_stats_text(self, stats):
+        self.stats_text = (
+            f'Expanded: {stats.expanded} Relaxed: {stats.relaxed}<br>'
+            f'Pushes: {stats.pushes} Pops: {stats.pops}<br>'
+            f'Peak frontier: {stats.peak_frontier}<br>'
+            f'Steps: {stats.steps} in {stats.step_time:.2f} s<br>'
+        )
+        if stats.peak_memory is not None:
+            self.stats_text += f'Peak memory: {stats.peak_memory / 2**20:.0f} MB<br>'
+        self.__rebuild()
 
 class SolverDropDown():
     
@@ -71,6 +95,39 @@ class SolverDropDown():
             manager=self.gui_manager
         )
 
+# Continous mode speed as power of two steps per frame
+MAX_SPEED_EXPONENT = 20
+
+class SpeedSlider():
+
+    def __init__(self, gui_manager, x, y, width, height):
+        self.gui_manager = gui_manager
+        self.rect = pygame.Rect(x, y, width, height)
+        self.exponent = 0
+        self.label = UILabel(
+            pygame.Rect(x, y, width, height / 2),
+            self.__label_text(),
+            manager=self.gui_manager
+        )
+        self.slider = UIHorizontalSlider(
+            pygame.Rect(x, y + height / 2, width, height / 2),
+            self.exponent,
+            (0, MAX_SPEED_EXPONENT),
+            manager=self.gui_manager
+        )
+
+    def __label_text(self):
+        return f'Speed: {2 ** self.exponent} steps/frame'
+
+    # Steps per frame
+    def speed(self):
+        return 2 ** self.exponent
+
+    def update_speed(self):
+        self.exponent = int(self.slider.get_current_value())
+        self.label.set_text(self.__label_text())
+        return self.speed()
+
 class SaveLoad():
 
     def __init__(self, gui_manager, x, y, width, height):
@@ -102,7 +159,8 @@ class MyGui():
         self.rect = pygame.Rect(x, y, width, height)
         self.title_box = TitleBox(self.gui_manager, x, 0, width, 50)
         self.solver_drop_down = SolverDropDown(self.gui_manager, x, 50, width, 50)
-        self.info_panel = InfoPanel(self.gui_manager, x, 100, width, height - 200, update_mode)
+        self.info_panel = InfoPanel(self.gui_manager, x, 100, width, height - 250, update_mode)
+        self.speed_slider = SpeedSlider(self.gui_manager, x, height-150, width, 50)
         self.save_load = SaveLoad(self.gui_manager, x, height-100, width, 100)
 
     def process_event(self, event):
@@ -119,6 +177,19 @@ class MyGui():
     def update_infobox_path(self, path_len):
         self.info_panel.update_path_text(path_len)
 
+    def update_infobox_progress(self, progress):
+        self.info_panel.update_progress_text(progress)
+
+    def update_infobox_stats(self, stats):
+        self.info_panel.update_stats_text(stats)
+
+    # Reads speed slider, returns steps per frame
+    def update_speed(self):
+        return self.speed_slider.update_speed()
+
+    def is_speed_slider(self, element):
+        return element is self.speed_slider.slider
+
     def get_file_name(self):
         return self.save_load.fname_text_box.text
 
@@ -0,0 +1,148 @@
+import heapq
+import itertools
+
+
+# Binary heap priority queue with lazy invalidation
+# Pushing an item that is already queued acts as decrease-key, the old heap entry
+# is left in place and skipped when it surfaces. Priorities can be any comparable
+# value, tuples are handy for tie-breaking. Pushes, pops and peak size are counted
+# for solver stats.
+class PriorityQueue:
+    def __init__(self):
+        self.__heap = []
+        self.__entries = {}  # item -> current priority
+        self.__counter = itertools.count()  # Keeps pop order stable for equal priorities
+        self.pushes = 0
+        self.pops = 0
+        self.peak = 0  # Largest number of queued items
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, item):
+        return item in self.__entries
+
+    def __iter__(self):
+        return iter(self.__entries)
+
+    # Add item or update priority of queued item
+    def push(self, item, priority):
+        entries = self.__entries
+        entries[item] = priority
+        heapq.heappush(self.__heap, (priority, next(self.__counter), item))
+        self.pushes += 1
+        if len(entries) > self.peak:
+            self.peak = len(entries)
+
+    # Pop item with lowest priority, returns None if queue is empty
+    def pop(self):
+        while self.__heap:
+            priority, _, item = heapq.heappop(self.__heap)
+            if self.__entries.get(item) == priority:
+                del self.__entries[item]
+                self.pops += 1
+                return item
+        return None
+
+    # Lowest priority in queue or None if queue is empty
+    def peek_priority(self):
+        while self.__heap:
+            priority, _, item = self.__heap[0]
+            if self.__entries.get(item) == priority:
+                return priority
+            heapq.heappop(self.__heap)
+        return None
+
+    def priority(self, item):
+        return self.__entries.get(item)
+
+    def remove(self, item):
+        self.__entries.pop(item, None)
+
+    def clear(self):
+        self.__heap = []
+        self.__entries = {}
+
+
+# Monotone bucket queue for small integer priorities (Dial's algorithm)
+# Items wait in a circular array of span + 1 buckets, one per priority value, so push
+# and pop take constant time apart from skipping empty buckets. Popped priorities
+# never decrease and pushed priorities are at most span above the lowest queued one,
+# which holds for Dijkstra with integer edge weights up to span. Decrease-key and
+# counters work like in PriorityQueue, the old entry is skipped when its bucket comes up.
+class BucketQueue:
+    def __init__(self, span):
+        self.__span = span + 1
+        self.__buckets = [[] for _ in range(self.__span)]
+        self.__entries = {}  # item -> current priority
+        self.__current = 0  # No queued priority is lower than this
+        self.pushes = 0
+        self.pops = 0
+        self.peak = 0  # Largest number of queued items
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, item):
+        return item in self.__entries
+
+    def __iter__(self):
+        return iter(self.__entries)
+
+    # Add item or update priority of queued item
+    def push(self, item, priority):
+        current = self.__current
+        if not current <= priority < current + self.__span:
+            if self.__entries or priority < current:
+                raise ValueError("Priority %d out of bucket range %d-%d" % (priority, current, current + self.__span - 1))
+            # Nothing queued, start the range from priority
+            self.__current = priority
+        entries = self.__entries
+        entries[item] = priority
+        self.__buckets[priority % self.__span].append(item)
+        self.pushes += 1
+        if len(entries) > self.peak:
+            self.peak = len(entries)
+
+    # Pop item with lowest priority, returns None if queue is empty
+    def pop(self):
+        entries = self.__entries
+        buckets = self.__buckets
+        span = self.__span
+        current = self.__current
+        while entries:
+            bucket = buckets[current % span]
+            while bucket:
+                item = bucket.pop()
+                if entries.get(item) == current:
+                    del entries[item]
+                    self.__current = current
+                    self.pops += 1
+                    return item
+            current += 1
+        self.__current = current
+        return None
+
+    # Lowest priority in queue or None if queue is empty
+    def peek_priority(self):
+        entries = self.__entries
+        buckets = self.__buckets
+        while entries:
+            bucket = buckets[self.__current % self.__span]
+            while bucket and entries.get(bucket[-1]) != self.__current:
+                bucket.pop()
+            if bucket:
+                return self.__current
+            self.__current += 1
+        return None
+
+    def priority(self, item):
+        return self.__entries.get(item)
+
+    def remove(self, item):
+        self.__entries.pop(item, None)
+
+    def clear(self):
+        self.__buckets = [[] for _ in range(self.__span)]
+        self.__entries = {}
+        self.__current = 0
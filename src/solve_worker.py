@@ -0,0 +1,104 @@
+from collections import namedtuple
+import threading
+import time
+import logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+from cell_grid import CellGrid, Cell
+import solver as slvr
+
+# Progress of a background solve, steps is the number of solve steps run so far
+# and frontier the number of cells queued to be expanded
+SolveProgress = namedtuple('SolveProgress', ['steps', 'frontier', 'seconds'])
+
+# Progress is published after this many steps
+PROGRESS_INTERVAL = 2048
+
+# Worker releases the interpreter lock after this many steps, so the UI thread
+# doesn't wait for the switch interval on every frame
+YIELD_INTERVAL = 256
+
+
+# Solves on a snapshot of a grid in a background thread
+# The worker gets its own copy of the grid and its own solver, so the UI thread can
+# keep editing and drawing the live grid. Progress is published as SolveProgress
+# and can be read from any thread. Cancelling stops the worker before its next step
+# without waiting for it, a cancelled worker is dropped along with its result.
+# When done, solver and grid hold the result and replace the live ones.
+# Solvers with a solve_all of their own, like the bulk maze generators, run it in one
+# go and check the cancel event through Solver.stop_event.
+class SolveWorker:
+    def __init__(self, solver_name, grid: CellGrid):
+        self.grid = grid.copy()
+        self.solver = slvr.SOLVERS[solver_name](solver_name, self.grid)
+        self.solver.reset(self.grid)
+        self.progress = SolveProgress(0, self.solver.frontier_size(), 0.0)
+        self.error = None  # Exception raised by solver
+        self.__cancel = threading.Event()
+        self.__done = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name='SolveWorker ' + solver_name, daemon=True)
+
+    def start(self):
+        self.__thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self.__done.is_set()
+
+    @property
+    def cancelled(self):
+        return self.__cancel.is_set()
+
+    # Stop solving, worker thread finishes its current step on its own
+    def cancel(self):
+        self.__cancel.set()
+
+    # Called after cell of the live grid was edited
+    # Cancels solving if the edit touches the solve, returns True if it did.
+    # Maze generators write the whole grid, so any edit cancels them.
+    def cell_edited(self, grid: CellGrid, cell: Cell):
+        snap = self.grid
+        moved = ((grid.start_cell.x, grid.start_cell.y) != (snap.start_cell.x, snap.start_cell.y)
+                 or (grid.end_cell.x, grid.end_cell.y) != (snap.end_cell.x, snap.end_cell.y))
+        if (moved or self.solver.name not in slvr.PATHFINDERS
+                or self.solver.cell_in_use(snap.get_cell(cell.x, cell.y))):
+            logger.debug("Cancelling %s after edit of (%d, %d)", self.solver.name, cell.x, cell.y)
+            self.cancel()
+            return True
+        return False
+
+    # Grid with the result of a finished solve, for replacing live grid
+    # Path finders don't change cell types, so edits made to the live grid meanwhile
+    # are copied over. Generated mazes are kept as is.
+    def result_grid(self, grid: CellGrid):
+        if self.solver.name in slvr.PATHFINDERS:
+            self.grid.set_types(bytes(grid._types))
+            self.grid.set_costs(bytearray(grid._costs) if grid.has_terrain else None)
+        return self.grid
+
+    def __run(self):
+        solver = self.solver
+        start = time.perf_counter()
+        steps = 0
+        try:
+            if type(solver).solve_all is not slvr.Solver.solve_all:
+                solver.stop_event = self.__cancel
+                solver.solve_all()
+            else:
+                solve_step = solver.solve_step
+                cancel = self.__cancel
+                while not solver.solved and not solver.no_path and not cancel.is_set():
+                    solve_step()
+                    steps += 1
+                    if steps % YIELD_INTERVAL == 0:
+                        time.sleep(0)
+                        if steps % PROGRESS_INTERVAL == 0:
+                            self.progress = SolveProgress(steps, solver.frontier_size(), time.perf_counter() - start)
+                solver.stats.add_steps(steps, time.perf_counter() - start)
+        except Exception as e:
+            logger.exception(e)
+            self.error = e
+        self.progress = SolveProgress(steps, solver.frontier_size(), time.perf_counter() - start)
+        self.__done.set()
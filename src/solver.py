@@ -3,29 +3,123 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 from abc import ABC, abstractmethod
+from array import array
 import math
+from collections import deque, Counter
+from datetime import datetime
 import heapq
-from collections import deque
+import itertools
 import random
+import time
 
-from cell_grid import CellGrid, Cell, CellType, CELL_COLORS
+import numpy as np
+
+from cell_grid import CellGrid, Cell, CellType, CELL_TYPES, WALL_VALUE, FLOOR_VALUE, DIAG_COST, TERRAIN_MAX
+from priority_queue import PriorityQueue, BucketQueue
+from flow_field import DistanceField, FlowField
+from solver_stats import SolverStats, peak_memory
+import bulk_maze
+
+
+# Cell states of solvers, kept in Solver.states by flat cell index
+# Solvers can use values after these for states of their own.
+STATE_NONE = 0
+STATE_OPEN = 1  # Queued to be expanded
+STATE_CLOSED = 2  # Expanded or visited
+STATE_FRONTIER = 3  # Scanned or waiting at the edge of solved area
+STATE_PATH = 4
+
+# Long solve_all loops check for a stop request after this many steps
+STOP_CHECK_INTERVAL = 4096
 
 
 class Solver(ABC):
+    # Overlay color of each state, None draws the cell with its type color
+    STATE_COLORS = (None, None, None, None, None)
 
     def __init__(self, name, grid: CellGrid):
         self.name = name
         self._grid = grid
         self.solved = False
         self.no_path = False
+        self._dirty = None  # Cells with changed overlay color, None means all
+        self.states = bytearray()  # Cell states, allocated for the grid on reset
+        self.stats = SolverStats()
+        self.stop_event = None  # Event set from another thread to stop solve_all early
 
     def reset(self, grid: CellGrid):
         self._grid = grid
         self.solved = False
         self.no_path = False
+        self._reset_states()
 
-    def show(self, surface):
-        raise NotImplementedError
+    # Overlay color of cell or None if cell is drawn with its type color
+    # Covers incrementally updated solver state, like open and closed sets
+    def get_overlay_color(self, cell: Cell):
+        return self.STATE_COLORS[self.states[cell._idx]]
+
+    # Overlay that is rebuilt every frame as list of (color, cells) layers
+    # Layers are drawn in order after overlay colors, color None means the cell type color
+    def get_volatile_overlay(self):
+        return []
+
+    # Cells whose overlay color changed since last call
+    # Returns None if the whole overlay has to be redrawn
+    # Tracking starts on first call so headless solving doesn't collect cells
+    def pop_dirty_cells(self):
+        res = self._dirty
+        self._dirty = set()
+        return res
+
+    # Mark overlay color of cell changed
+    def _touch(self, cell):
+        if self._dirty is not None:
+            self._dirty.add(cell)
+
+    # Mark whole overlay changed
+    def _touch_all(self):
+        self._dirty = None
+
+    # Clear states of all cells for grid, a new run starts with new stats
+    def _reset_states(self):
+        self.states = bytearray(self._grid.width * self._grid.height)
+        self.stats = SolverStats()
+        self._touch_all()
+
+    # Clear states and grid search values for a new run on grid
+    # When this solver ran last on the grid, only the touched cells of that run are
+    # cleared, so short queries on a large map don't pay for the whole map.
+    def _reset_search(self, grid, touched):
+        if grid._search_owner is self and len(self.states) == grid.width * grid.height:
+            states = self.states
+            g_costs, h_costs, f_costs, previous = (grid._g, grid._h, grid._f, grid._previous)
+            for idx in touched:
+                states[idx] = STATE_NONE
+                g_costs[idx] = math.inf
+                h_costs[idx] = 0.0
+                f_costs[idx] = 0.0
+                previous[idx] = -1
+            self.stats = SolverStats()
+            self._touch_all()
+        else:
+            self._reset_states()
+            grid.reset_heuristics(math.inf)
+            grid._search_owner = self
+
+    # Check if solve_all running in another thread was asked to stop
+    def _stop_requested(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _set_state(self, cell, state):
+        self.states[cell._idx] = state
+        self._touch(cell)
+
+    # Set state of cells in rectangle, overlay is not touched
+    def _fill_states(self, x, y, w, h, state):
+        width = self._grid.width
+        row = bytes([state]) * w
+        for j in range(y, y + h):
+            self.states[j * width + x:j * width + x + w] = row
 
     def solve_step(self):
         raise NotImplementedError
@@ -33,18 +127,64 @@ class Solver(ABC):
     def solve_all(self):
         if self.solved or self.no_path:
             return
+        start = time.perf_counter()
+        steps = 0
         while not self.solved and not self.no_path:
             self.solve_step()
+            steps += 1
+        self.stats.add_steps(steps, time.perf_counter() - start)
 
     # Check if cell is being used by solver
     def cell_in_use(self, cell: Cell):
-        raise NotImplementedError
+        return self.states[cell._idx] != STATE_NONE
+
+    # Called after type of cell was edited
+    # Solving starts over if the cell was in use, returns True if it did
+    def cell_edited(self, cell: Cell):
+        if self.cell_in_use(cell):
+            self.reset(self._grid)
+            return True
+        return False
 
     def get_path(self):
         raise NotImplementedError
 
+    # Number of cells queued to be expanded
+    def frontier_size(self):
+        return self.states.count(STATE_OPEN)
+
+    # Queues of current run, their counters go to stats
+    def _queues(self):
+        return ()
+
+    # Stats of current run with queue counters and memory high-water mark filled in
+    def get_stats(self):
+        stats = self.stats
+        queues = self._queues()
+        if queues:
+            stats.pushes = sum(q.pushes for q in queues)
+            stats.pops = sum(q.pops for q in queues)
+            stats.peak_frontier = sum(q.peak for q in queues)
+        stats.peak_memory = peak_memory()
+        return stats
+
+    # Stats of current run with solver and grid as dict, for exporting as json
+    def run_stats(self):
+        res = {
+            'solver': self.name,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'width': self._grid.width,
+            'height': self._grid.height,
+            'solved': self.solved,
+            'no_path': self.no_path
+        }
+        res.update(self.get_stats().as_dict())
+        return res
+
+    # Cells that have a state
     def get_cells_in_use(self):
-        raise NotImplementedError
+        get_cell = self._grid.get_cell_by_index
+        return [get_cell(idx) for idx, state in enumerate(self.states) if state != STATE_NONE]
 
 
 ###############################################################
@@ -71,342 +211,1357 @@ def octile_heur(x1, y1, x2, y2):
     return math.sqrt(mmin*mmin + mmin*mmin) + d
 
 
+# Octile distance with the move costs of octile_neighbors
+# Consistent heuristic for them, octile_heur overestimates diagonals slightly
+def octile_cost(x1, y1, x2, y2):
+    x = abs(x1 - x2)
+    y = abs(y1 - y2)
+    return min(x, y) * DIAG_COST + abs(x - y)
+
+
+# Neighbors of x, y as (x, y, move cost) on the 8 direction movement model
+# Diagonal moves need at least one of the two adjacent straight cells free
+def octile_neighbors(grid: CellGrid, x, y):
+    return [(x + dx, y + dy, cost) for _, dx, dy, cost in grid.moves(y * grid.width + x)]
+
+
 # A* (A-star) path finding algorithm
+# Search runs on flat cell indices over the move masks of the grid, cells are
+# only created for the current cell. Moves are scaled by terrain costs of the grid.
 class Astar(Solver):
+    # Closedset in dark green, openset in light green
+    STATE_COLORS = (None, (0, 150, 50), (0, 100, 25), None, None)
+
     def __init__(self, name, grid: CellGrid):
         super().__init__(name, grid)
-        self.__openset = set()
-        self.__closedset = set()
+        self.__openset = PriorityQueue()
+        self.__expanded = array('i')  # Closed cells of current run, for resetting them
         self.__current_cell = None
-        #self.no_path = False
-        #self.reset(self._grid)
 
     # Solve 1 step of astar
     def solve_step(self):
-        #logger.info("Solving 1 step of astar")
         if self.solved or self.no_path:
             return
-        
-        if len(self.__openset) == 0:
-            self.no_path = True
-            logger.info('No possible path!')
-            return
 
         if self.__current_cell == self._grid.end_cell:
             logger.info("Found shortest path with Astar! length: %d", len(self._grid.get_path(self.__current_cell)))
             self.solved = True
             return
 
-        #logger.info("Solving 1 step of astar")
-        # End cell indices
-        e_x, e_y = (self._grid.end_cell.x, self._grid.end_cell.y)
-
-        # Get cell with lowest f value
-        c_lowest = None
-        f_lowest = 1000000
-        d_lowest = 1000000
-        
-        for cell in self.__openset:
-            if cell.f < f_lowest:  # Pick cell with lowest f cost
-                d_lowest = octile_heur(cell.x, cell.y, e_x, e_y)
-                c_lowest = cell
-                f_lowest = cell.f
-            elif cell.f == f_lowest:  # If f cost are same, pick the one with lower distance to goal
-                d = octile_heur(cell.x, cell.y, e_x, e_y)
-                if d < d_lowest:
-                    d_lowest = d
-                    f_lowest = cell.f
-                    c_lowest = cell
+        # Get cell with lowest f value, ties are broken by lower distance to goal
+        idx = self.__openset.pop()
+        if idx is None:
+            self.no_path = True
+            logger.info('No possible path!')
+            return
 
+        grid = self._grid
+        self.__expanded.append(idx)
+        self.__current_cell = grid.get_cell_by_index(idx)
+        self._set_state(self.__current_cell, STATE_CLOSED)
         logger.debug("Current Cell (%d %d), g %f, h %f, f %f", self.__current_cell.x, self.__current_cell.y, self.__current_cell.g, self.__current_cell.h, self.__current_cell.f)
-        logger.debug("Lowest Cell  (%d %d), g %f, h %f, f %f", c_lowest.x, c_lowest.y, c_lowest.g, c_lowest.h, c_lowest.f)
-        
-        self.__current_cell = c_lowest
-        self.__openset.remove(self.__current_cell)
-        self.__closedset.add(self.__current_cell)
 
+        states = self.states
+        g_costs, h_costs, f_costs, previous = (grid._g, grid._h, grid._f, grid._previous)
+        end = grid.end_cell
         c_x, c_y = (self.__current_cell.x, self.__current_cell.y)
-        # Loop adjacent cells and update them
-        for dir_x, dir_y in [(1,0), (0,1), (-1,0), (0,-1)]:
-            n_x, n_y = (c_x + dir_x, c_y + dir_y)
-            if not self._grid.in_bounds(n_x, n_y):
+        costs = grid._costs
+        cur_g = g_costs[idx]
+        moves = grid.moves(idx)
+        self.stats.expanded += 1
+        self.stats.relaxed += len(moves)
+        # Update adjacent cells
+        for offset, dx, dy, cost in moves:
+            n_idx = idx + offset
+            if states[n_idx] == STATE_CLOSED:
                 continue
-            
-            # Update adjacent neighbor heuristics
-            cell = self._grid.get_cell(n_x, n_y)
-            if cell not in self.__closedset and cell.type != CellType.WALL:
-                self.__update_cell_heuristics(n_x, n_y, 1)
-
-                diag_g = 1.414213
-                # Check for diagonals adjacent to neighbor and update them
-                if dir_y == 0:
-                    d_y1 = n_y - 1
-                    d_y2 = n_y + 1
-                    if self._grid.in_bounds(n_x, d_y1):
-                        self.__update_cell_heuristics(n_x, d_y1, diag_g)
-                    if self._grid.in_bounds(n_x, d_y2):
-                        self.__update_cell_heuristics(n_x, d_y2, diag_g)
-                elif dir_x == 0:
-                    d_x1 = n_x - 1
-                    d_x2 = n_x + 1
-                    if self._grid.in_bounds(d_x1, n_y):
-                        self.__update_cell_heuristics(d_x1, n_y, diag_g)
-                    if self._grid.in_bounds(d_x2, n_y):
-                        self.__update_cell_heuristics(d_x2, n_y, diag_g)
+            if costs is not None:
+                cost = cost * (costs[idx] + costs[n_idx]) * 0.5
+            g = cur_g + cost
+            if g < g_costs[n_idx]:
+                h = octile_heur(c_x + dx, c_y + dy, end.x, end.y)
+                g_costs[n_idx] = g
+                h_costs[n_idx] = h
+                f_costs[n_idx] = g + h
+                previous[n_idx] = idx
+                # Adds cell to openset or lowers its priority if already queued
+                self.__openset.push(n_idx, (g + h, h))
+                states[n_idx] = STATE_OPEN
+                if self._dirty is not None:
+                    self._dirty.add(grid.get_cell_by_index(n_idx))
 
     def cell_in_use(self, cell):
-        return cell == self.__current_cell or cell in self.__openset or cell in self.__closedset or cell == self._grid.start_cell or cell == self._grid.end_cell
-
-    def get_cells_in_use(self):
-        return list(self.__openset) + list(self.__closedset)
-
-    # Parameters x and y are position of cell to be updated, g is g-cost from previous cell
-    def __update_cell_heuristics(self, x, y, g):
-        cell = self._grid.get_cell(x, y)
-        if cell not in self.__closedset and cell.type != CellType.WALL:
-            g = self.__current_cell.g + g
-            h = octile_heur(cell.x, cell.y, self._grid.end_cell.x, self._grid.end_cell.y)
-            if g < cell.g:
-                cell.g = g
-                cell.h = h
-                cell.f = g + h
-                cell.previous = self.__current_cell
-                if cell not in self.__openset:
-                    self.__openset.add(cell)
+        return super().cell_in_use(cell) or cell == self._grid.start_cell or cell == self._grid.end_cell
 
-    # Reset cell heuristics in grid
-    def __reset_heuristics(self):
-        for c in self._grid:
-            c.h = 0
-            c.g = 1000000
-            c.f = 0
-            c.previous = None
+    def _queues(self):
+        return (self.__openset,)
 
     # Reset astar solving
     def reset(self, grid):
         self._grid = grid
-        self.__openset = set()
-        self.__openset.add(self._grid.start_cell)
-        self.__closedset = set()
+        self._reset_search(grid, itertools.chain(self.__expanded, self.__openset))
+        self.__openset = PriorityQueue()
+        self.__expanded = array('i')
         self.__current_cell = self._grid.start_cell
-        self.__reset_heuristics()
         self.__current_cell.g = 0
+        self.__openset.push(self.__current_cell._idx, (0, 0))
+        self.states[self.__current_cell._idx] = STATE_OPEN
         self.solved = False
         self.no_path = False
 
-    # Draw openset, closedset and path
-    def show(self, surface):
-        # First draw openset in light green
-        for c in self.__openset:
-            c.show(surface, (0, 150, 50))
-        # Then draw closedset in dark green
-        for c in self.__closedset:
-            c.show(surface, (0, 100, 25))
-        # And at last construct path and draw it in bright green
+    # Construct path and draw it in bright green
+    def get_volatile_overlay(self):
+        res = []
         if self.solved or len(self.__openset) > 0:
-            path = self._grid.get_path(self.__current_cell)
-            for c in path:
-                c.show(surface, (0, 220, 100))
-            self.__current_cell.show(surface, (100, 250, 150))
-        self._grid.start_cell.show(surface)
-        self._grid.end_cell.show(surface)
+            res.append(((0, 220, 100), self._grid.get_path(self.__current_cell)))
+            res.append(((100, 250, 150), [self.__current_cell]))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
 
     def get_path(self):
         return self._grid.get_path(self.__current_cell)
 
 
+# Dijkstra, on flat cell indices and terrain costs like Astar
 class Dijkstra(Solver):
+    # Visited cells in green
+    STATE_COLORS = (None, None, (0, 150, 40), None, None)
+
     def __init__(self, name, grid: CellGrid):
         super().__init__(name, grid)
-        self.__visited = set()
-        self.__unvisited = []
+        self.__unvisited = PriorityQueue()
+        self.__expanded = array('i')  # Visited cells of current run, for resetting them
         self.__current_cell = None
         self.no_path = False
-        self.reset(self._grid)
     
     def solve_step(self):
-        #if len(self.__unvisited) > 0 and not self.solved:
         if self.solved or self.no_path:
             return
-        if len(self.__unvisited) == 0:
-            self.no_path = True
-            logger.info('No possible path!')
-            return
 
         if self.__current_cell == self._grid.end_cell:
             logger.info("Found path with %s! length: %d", self.name, len(self._grid.get_path(self.__current_cell)))
             self.solved = True
             return
-        
+
         logger.debug('Solving one step of Dijkstra!')
-        cur_g, cur_cell = heapq.heappop(self.__unvisited)
-        self.__visited.add(cur_cell)
-        tempnbrs = []
-        for dir_x, dir_y in [(1,0), (0,1), (-1,0), (0,-1)]:
-            n_x, n_y = (cur_cell.x + dir_x, cur_cell.y + dir_y)
-            
-            if not self._grid.in_bounds(n_x, n_y):
-                continue
+        # Stale heap entries are skipped by the queue
+        idx = self.__unvisited.pop()
+        if idx is None:
+            self.no_path = True
+            logger.info('No possible path!')
+            return
+
+        grid = self._grid
+        self.__expanded.append(idx)
+        cur_cell = grid.get_cell_by_index(idx)
+        self._set_state(cur_cell, STATE_CLOSED)
+        states = self.states
+        g_costs, previous = (grid._g, grid._previous)
+        costs = grid._costs
+        cur_g = g_costs[idx]
+        moves = grid.moves(idx)
+        self.stats.expanded += 1
+        self.stats.relaxed += len(moves)
+        for offset, _, _, cost in moves:
+            n_idx = idx + offset
+            if costs is not None:
+                cost = cost * (costs[idx] + costs[n_idx]) * 0.5
+            g = cur_g + cost
+            # Lower g cost of neighbor and queue it, queued cells are moved up in the queue
+            if g < g_costs[n_idx] and states[n_idx] != STATE_CLOSED:
+                g_costs[n_idx] = g
+                previous[n_idx] = idx
+                self.__unvisited.push(n_idx, g)
+                states[n_idx] = STATE_OPEN
 
-            nc = self._grid.get_cell(n_x, n_y)
-            if nc not in self.__visited and nc.type != CellType.WALL:
-                # Update neighbor
-                self.__update_cell_heuristics(n_x, n_y, cur_g + 1.0, cur_cell)
-                tempnbrs.append(nc)
-
-                # Update adjacent diagonals
-                diag_g = 1.414213
-                if dir_x == 0:
-                    x1 = n_x - 1
-                    x2 = n_x + 1
-                    if self._grid.in_bounds(x1, n_y):
-                        self.__update_cell_heuristics(x1, n_y, cur_g + diag_g, cur_cell)
-                        c = self._grid.get_cell(x1, n_y)
-                        if c not in tempnbrs and c not in self.__visited and c.type != CellType.WALL:
-                            tempnbrs.append(c)
-                    if self._grid.in_bounds(x2, n_y):
-                        self.__update_cell_heuristics(x2, n_y, cur_g + diag_g, cur_cell)
-                        c = self._grid.get_cell(x2, n_y)
-                        if c not in tempnbrs and c not in self.__visited and c.type != CellType.WALL:
-                            tempnbrs.append(c)
-                elif dir_y == 0:
-                    y1 = n_y - 1
-                    y2 = n_y + 1
-                    if self._grid.in_bounds(n_x, y1):
-                        self.__update_cell_heuristics(n_x, y1, cur_g + diag_g, cur_cell)
-                        c = self._grid.get_cell(n_x, y1)
-                        if c not in tempnbrs and c not in self.__visited and c.type != CellType.WALL:
-                            tempnbrs.append(c)
-                    if self._grid.in_bounds(n_x, y2):
-                        self.__update_cell_heuristics(n_x, y2, cur_g + diag_g, cur_cell)
-                        c = self._grid.get_cell(n_x, y2)
-                        if c not in tempnbrs and c not in self.__visited and c.type != CellType.WALL:
-                            tempnbrs.append(c)
-
-        # Update current cell and sort unvisited cells
         self.__current_cell = cur_cell
-        for nbr in tempnbrs:
-            self.__unvisited.append((nbr.g, nbr))
-        self.__sort_unvisited()
-    
-    #def solve_all(self):
-    #    logger.info('Solving %s!', self.name)
-    #    while not self.solved and len(self.__unvisited) > 0:
-    #        self.solve_step()
 
     def cell_in_use(self, cell):
-        return cell == self.__current_cell or cell in self.__unvisited or cell in self.__visited or cell == self._grid.start_cell or cell == self._grid.end_cell
+        return super().cell_in_use(cell) or cell == self._grid.start_cell or cell == self._grid.end_cell
 
-    def get_cells_in_use(self):
-        return list(self.__unvisited) + list(self.__visited)
-
-    def __update_cell_heuristics(self, x, y, g, cur_cell):
-        c = self._grid.get_cell(x, y)
-        if g < c.g and c not in self.__visited and c.type != CellType.WALL:
-            c.g = g
-            c.previous = cur_cell
-
-    # Function to heapify unvisited cells
-    def __sort_unvisited(self):
-        #cells = [(cell.g, cell) for c_g, cell in self.__unvisited if cell not in self.__visited]
-        self.__unvisited = [(cell.g, cell) for c_g, cell in self.__unvisited if cell not in self.__visited]
-        setattr(Cell, "__lt__", lambda self, other: self.g < other.g)
-        heapq.heapify(self.__unvisited)
-    
-    def __reset_heuristics(self):
-        for c in self._grid:
-            c.g = 100000
-            c.previous = None
-        self.__current_cell.g = 0
+    def _queues(self):
+        return (self.__unvisited,)
 
     def reset(self, grid):
         self._grid = grid
+        self._reset_search(grid, itertools.chain(self.__expanded, self.__unvisited))
         self.__current_cell = grid.start_cell
-        self.__visited = set()
-        self.__unvisited = []
-        self.__reset_heuristics()
-        self.__unvisited.append((self.__current_cell.g, self.__current_cell))
-        self.__sort_unvisited()
+        self.__unvisited = PriorityQueue()
+        self.__expanded = array('i')
+        self.__current_cell.g = 0
+        self.__unvisited.push(self.__current_cell._idx, 0)
+        self.states[self.__current_cell._idx] = STATE_OPEN
         self.solved = False
         self.no_path = False
-        
-    def show(self, surface):
-        for c in self.__visited:
-            c.show(surface, (0, 150, 40))
+
+    def get_volatile_overlay(self):
+        res = []
         if self.solved or len(self.__unvisited) > 0:
-            path = self._grid.get_path(self.__current_cell)        
-            for c in path:
-                c.show(surface, (0, 200, 100))
-        self._grid.start_cell.show(surface)
-        self._grid.end_cell.show(surface)
+            res.append(((0, 200, 100), self._grid.get_path(self.__current_cell)))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
 
     def get_path(self):
         return self._grid.get_path(self.__current_cell)
 
 # Depth First Search
 class DFS(Solver):
+    # Cells on stack in green, visited cells in dark green
+    STATE_COLORS = (None, (0, 150, 40), (0, 100, 30), None, None)
+
     def __init__(self, name, grid: CellGrid):
         super().__init__(name, grid)
         self.__stack = deque()
+        self.__stack_count = Counter()  # Cell index -> times on stack
         self.__visited = set()
         self.__current_cell = None
-        #self.reset(self._grid)
         self.no_path = False
 
     def solve_step(self):
         if len(self.__stack) == 0 or self.no_path:
             return
             
-        c = self.__stack.pop()
-        self.__visited.add(c)
-        self.__current_cell = c
-        nbrs = self._grid.get_neighbors(c.x, c.y)
-        nbrs = [x for x in nbrs if x not in self.__visited and x.type != CellType.WALL]
-        for nbr in nbrs:
-            self.__stack.append(nbr)
-            nbr.previous = self.__current_cell
+        grid = self._grid
+        idx = self.__stack.pop()
+        self.__stack_count[idx] -= 1
+        self.__visited.add(idx)
+        self.__current_cell = grid.get_cell_by_index(idx)
+        # Cell stays open while another copy of it is on stack
+        self._set_state(self.__current_cell, STATE_OPEN if self.__stack_count[idx] > 0 else STATE_CLOSED)
+        previous = grid._previous
+        moves = grid.moves(idx)
+        stats = self.stats
+        stats.expanded += 1
+        stats.pops += 1
+        stats.relaxed += len(moves)
+        for offset, _, _, _ in moves:
+            n_idx = idx + offset
+            if n_idx not in self.__visited:
+                self.__stack.append(n_idx)
+                self.__stack_count[n_idx] += 1
+                self._set_state(grid.get_cell_by_index(n_idx), STATE_OPEN)
+                previous[n_idx] = idx
+                stats.pushes += 1
+        if len(self.__stack) > stats.peak_frontier:
+            stats.peak_frontier = len(self.__stack)
 
         if self.__current_cell == self._grid.end_cell:
             logger.info("Found path with %s! length: %d", self.name, len(self._grid.get_path(self.__current_cell)))
             self.solved = True
         elif len(self.__stack) == 0:
             logger.info('No valid path!')
-            #self.solved = True  # TODO Fix when no path
             self.no_path = True
 
     def cell_in_use(self, cell):
-        return cell == self.__current_cell or cell in self.__visited or cell in self.__stack or cell == self._grid.start_cell or cell == self._grid.end_cell
+        return super().cell_in_use(cell) or cell == self._grid.start_cell or cell == self._grid.end_cell
 
-    def get_cells_in_use(self):
-        return list(self.__stack) + list(self.__visited)
-    
     def reset(self, grid):
         self._grid = grid
-        for c in self._grid:
-            c.previous = None
+        self._reset_states()
+        self._grid.reset_heuristics()
         self.__visited = set()
         self.__stack = deque()
+        self.__stack_count = Counter()
         self.__current_cell: Cell = None
-        self.__stack.append(self._grid.start_cell)
+        start = self._grid.start_cell._idx
+        self.__stack.append(start)
+        self.__stack_count[start] += 1
+        self.states[start] = STATE_OPEN
         self.solved = False
-        self._no_path = False
+        self.no_path = False
 
-    def show(self, surface):
-        for c in self.__visited:
-            c.show(surface, (0, 100, 30))
-        for c in self.__stack:
-            c.show(surface, (0, 150, 40))
+    def get_volatile_overlay(self):
+        res = []
         if self.__current_cell != None and self.__current_cell.previous != None:
-            path = self._grid.get_path(self.__current_cell.previous)
-            for c in path:
-                c.show(surface, (0, 200, 100))
-        self._grid.start_cell.show(surface)
-        self._grid.end_cell.show(surface)
+            res.append(((0, 200, 100), self._grid.get_path(self.__current_cell.previous)))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
+
+    def get_path(self):
+        return self._grid.get_path(self.__current_cell)
+
+# Jump Point Search
+# A* over jump points on the same movement model as Astar: 8 directions, diagonal
+# moves allowed when at least one of the two adjacent straight cells is free.
+# Straight and diagonal runs of symmetric cells are scanned without queueing them,
+# only cells with forced neighbors (jump points) go to the open set.
+class JumpPointSearch(Solver):
+    # Closed jump points in dark green, open in light green, cells passed over by jumps dimmed
+    STATE_COLORS = (None, (0, 150, 50), (0, 100, 25), (30, 120, 110), None)
+
+    def __init__(self, name, grid: CellGrid):
+        super().__init__(name, grid)
+        self.__openset = PriorityQueue()
+        self.__current_cell = None
+
+    def solve_step(self):
+        if self.solved or self.no_path:
+            return
+
+        if self.__current_cell == self._grid.end_cell:
+            logger.info("Found shortest path with %s! length: %d", self.name, len(self.get_path()))
+            self.solved = True
+            return
+
+        c_lowest = self.__openset.pop()
+        if c_lowest is None:
+            self.no_path = True
+            logger.info('No possible path!')
+            return
+
+        self.__current_cell = c_lowest
+        self._set_state(c_lowest, STATE_CLOSED)
+        self.stats.expanded += 1
+
+        c_x, c_y = (c_lowest.x, c_lowest.y)
+        for dir_x, dir_y in self.__directions(c_lowest):
+            jump = self.__jump(c_x + dir_x, c_y + dir_y, dir_x, dir_y)
+            if jump is not None:
+                self.stats.relaxed += 1
+                steps = max(abs(jump[0] - c_x), abs(jump[1] - c_y))
+                g = steps * DIAG_COST if dir_x != 0 and dir_y != 0 else steps
+                self.__update_cell_heuristics(jump[0], jump[1], g)
+
+    # Directions to search from cell, natural and forced neighbors for direction of arrival
+    def __directions(self, cell):
+        walkable = self._grid.walkable
+        x, y = (cell.x, cell.y)
+        prev = cell.previous
+        res = []
+        if prev is None:
+            for dir_x, dir_y in [(1,0), (0,1), (-1,0), (0,-1)]:
+                res.append((dir_x, dir_y))
+            for dir_x, dir_y in [(1,1), (-1,1), (-1,-1), (1,-1)]:
+                if walkable(x + dir_x, y) or walkable(x, y + dir_y):
+                    res.append((dir_x, dir_y))
+            return res
+
+        dx = (x > prev.x) - (x < prev.x)
+        dy = (y > prev.y) - (y < prev.y)
+        if dx != 0 and dy != 0:
+            w_x = walkable(x + dx, y)
+            w_y = walkable(x, y + dy)
+            res.append((dx, 0))
+            res.append((0, dy))
+            if w_x or w_y:
+                res.append((dx, dy))
+            if w_y and not walkable(x - dx, y):
+                res.append((-dx, dy))
+            if w_x and not walkable(x, y - dy):
+                res.append((dx, -dy))
+        elif dx != 0:
+            res.append((dx, 0))
+            if walkable(x + dx, y):
+                if not walkable(x, y + 1):
+                    res.append((dx, 1))
+                if not walkable(x, y - 1):
+                    res.append((dx, -1))
+        else:
+            res.append((0, dy))
+            if walkable(x, y + dy):
+                if not walkable(x + 1, y):
+                    res.append((1, dy))
+                if not walkable(x - 1, y):
+                    res.append((-1, dy))
+        return res
+
+    # Scan from x, y in direction until a jump point is found
+    # Returns (x, y) of jump point or None if scan hit a wall
+    def __jump(self, x, y, dx, dy):
+        walkable = self._grid.walkable
+        if dx != 0 and dy != 0:
+            while walkable(x, y):
+                self.__scan(x, y)
+                if self.__is_goal(x, y):
+                    return (x, y)
+                if not walkable(x - dx, y) and walkable(x - dx, y + dy) and walkable(x, y + dy):
+                    return (x, y)
+                if not walkable(x, y - dy) and walkable(x + dx, y - dy) and walkable(x + dx, y):
+                    return (x, y)
+                # Diagonal run stops where a straight run finds a jump point
+                if self.__jump(x + dx, y, dx, 0) is not None or self.__jump(x, y + dy, 0, dy) is not None:
+                    return (x, y)
+                if not walkable(x + dx, y) and not walkable(x, y + dy):
+                    return None
+                x += dx
+                y += dy
+        elif dx != 0:
+            while walkable(x, y):
+                self.__scan(x, y)
+                if self.__is_goal(x, y):
+                    return (x, y)
+                if walkable(x + dx, y):
+                    if not walkable(x, y + 1) and walkable(x + dx, y + 1):
+                        return (x, y)
+                    if not walkable(x, y - 1) and walkable(x + dx, y - 1):
+                        return (x, y)
+                x += dx
+        else:
+            while walkable(x, y):
+                self.__scan(x, y)
+                if self.__is_goal(x, y):
+                    return (x, y)
+                if walkable(x, y + dy):
+                    if not walkable(x + 1, y) and walkable(x + 1, y + dy):
+                        return (x, y)
+                    if not walkable(x - 1, y) and walkable(x - 1, y + dy):
+                        return (x, y)
+                y += dy
+        return None
+
+    def __is_goal(self, x, y):
+        end = self._grid.end_cell
+        return x == end.x and y == end.y
+
+    def __scan(self, x, y):
+        idx = y * self._grid.width + x
+        if not self.states[idx]:
+            self.states[idx] = STATE_FRONTIER
+            if self._dirty is not None:
+                self._dirty.add(self._grid.get_cell(x, y))
+
+    # Parameters x and y are position of jump point, g is g-cost from current cell
+    def __update_cell_heuristics(self, x, y, g):
+        cell = self._grid.get_cell(x, y)
+        if self.states[cell._idx] != STATE_CLOSED:
+            g = self.__current_cell.g + g
+            if g < cell.g:
+                h = octile_heur(x, y, self._grid.end_cell.x, self._grid.end_cell.y)
+                cell.g = g
+                cell.h = h
+                cell.f = g + h
+                cell.previous = self.__current_cell
+                self.__openset.push(cell, (cell.f, cell.h))
+                self._set_state(cell, STATE_OPEN)
+
+    # Scanned cells are in use too, editing them can open or close a jump
+    def cell_in_use(self, cell):
+        return super().cell_in_use(cell) or cell == self._grid.start_cell or cell == self._grid.end_cell
+
+    def _queues(self):
+        return (self.__openset,)
+
+    def reset(self, grid):
+        self._grid = grid
+        self._reset_states()
+        self.__openset = PriorityQueue()
+        self.__current_cell = grid.start_cell
+        self._grid.reset_heuristics()
+        self.__current_cell.g = 0
+        self.__openset.push(self.__current_cell, (0, 0))
+        self.states[self.__current_cell._idx] = STATE_OPEN
+        self.solved = False
+        self.no_path = False
+
+    def get_volatile_overlay(self):
+        res = []
+        if self.solved or len(self.__openset) > 0:
+            res.append(((0, 220, 100), self.get_path()))
+            res.append(((100, 250, 150), [self.__current_cell]))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
+
+    # Path between jump points is filled in with straight and diagonal steps
+    def get_path(self):
+        res = []
+        cur = self.__current_cell
+        prev = cur.previous
+        while prev is not None:
+            dx = (prev.x > cur.x) - (prev.x < cur.x)
+            dy = (prev.y > cur.y) - (prev.y < cur.y)
+            x, y = (cur.x, cur.y)
+            while (x, y) != (prev.x, prev.y):
+                res.append(self._grid.get_cell(x, y))
+                x += dx
+                y += dy
+            cur = prev
+            prev = cur.previous
+        res.append(cur)
+        return res
+
+# States of backward search in BiAstar
+STATE_BACK_OPEN = 5
+STATE_BACK_CLOSED = 6
+
+# Bidirectional A*
+# Forward search from start and backward search from end take turns, the side with
+# the smaller open set expands one cell per step. Cost and parent of both directions
+# are kept in dicts, grid search values are left alone. Every relaxed cell that the
+# other side has reached gives a candidate path.
+# Both sides use half the difference of the heuristics to their target and to their
+# source as potential. It is consistent for both directions, so the search can stop
+# as soon as lowest keys of both open sets add up to the best path found.
+class BiAstar(Solver):
+    # Forward search in greens, backward search in blues
+    STATE_COLORS = (None, (0, 150, 50), (0, 100, 25), None, None, (40, 110, 200), (0, 60, 120))
+
+    def __init__(self, name, grid: CellGrid):
+        super().__init__(name, grid)
+        self.__g = ({}, {})  # Forward and backward cell -> g
+        self.__parent = ({}, {})  # Forward and backward cell -> previous cell
+        self.__open = (PriorityQueue(), PriorityQueue())
+        self.__closed = (set(), set())
+        self.__targets = (None, None)
+        self.__best = math.inf  # Cost of best path found so far
+        self.__meet = None  # Cell where best path's halves meet
+        self.__current_cell = None
+
+    def _heuristic(self, x, y, target):
+        return octile_cost(x, y, target.x, target.y)
+
+    def __potential(self, x, y, side):
+        return (self._heuristic(x, y, self.__targets[side]) - self._heuristic(x, y, self.__targets[1 - side])) / 2
+
+    def solve_step(self):
+        if self.solved or self.no_path:
+            return
+
+        open_f, open_b = self.__open
+        key_f = open_f.peek_priority()
+        key_b = open_b.peek_priority()
+        if key_f is None or key_b is None or self.__best <= key_f + key_b:
+            if self.__meet is None:
+                self.no_path = True
+                logger.info('No possible path!')
+            else:
+                self.solved = True
+                logger.info("Found shortest path with %s! length: %d", self.name, len(self.get_path()))
+            return
+
+        side = 0 if len(open_f) <= len(open_b) else 1
+        g, parent = (self.__g[side], self.__parent[side])
+        other_g = self.__g[1 - side]
+        cur = self.__open[side].pop()
+        self.__closed[side].add(cur)
+        self.__current_cell = cur
+        self.__update_state(cur)
+
+        cur_g = g[cur]
+        neighbors = octile_neighbors(self._grid, cur.x, cur.y)
+        self.stats.expanded += 1
+        self.stats.relaxed += len(neighbors)
+        for n_x, n_y, cost in neighbors:
+            nc = self._grid.get_cell(n_x, n_y)
+            if nc in self.__closed[side]:
+                continue
+            n_g = cur_g + cost
+            if n_g < g.get(nc, math.inf):
+                g[nc] = n_g
+                parent[nc] = cur
+                self.__open[side].push(nc, n_g + self.__potential(n_x, n_y, side))
+                self.__update_state(nc)
+                if nc in other_g and n_g + other_g[nc] < self.__best:
+                    self.__best = n_g + other_g[nc]
+                    self.__meet = nc
+
+    # Closed sets before open sets, forward search before backward
+    def __update_state(self, cell):
+        if cell in self.__closed[0]:
+            state = STATE_CLOSED
+        elif cell in self.__closed[1]:
+            state = STATE_BACK_CLOSED
+        elif cell in self.__open[0]:
+            state = STATE_OPEN
+        elif cell in self.__open[1]:
+            state = STATE_BACK_OPEN
+        else:
+            state = STATE_NONE
+        self._set_state(cell, state)
+
+    def frontier_size(self):
+        return self.states.count(STATE_OPEN) + self.states.count(STATE_BACK_OPEN)
+
+    def _queues(self):
+        return self.__open
+
+    def cell_in_use(self, cell):
+        return super().cell_in_use(cell) or cell == self._grid.start_cell or cell == self._grid.end_cell
+
+    def reset(self, grid):
+        self._grid = grid
+        self._reset_states()
+        start, end = (grid.start_cell, grid.end_cell)
+        self.__g = ({start: 0.0}, {end: 0.0})
+        self.__parent = ({}, {})
+        self.__open = (PriorityQueue(), PriorityQueue())
+        self.__closed = (set(), set())
+        self.__targets = (end, start)
+        self.__best = math.inf
+        self.__meet = None
+        self.__current_cell = None
+        self.__open[0].push(start, self.__potential(start.x, start.y, 0))
+        self.__open[1].push(end, self.__potential(end.x, end.y, 1))
+        self.__update_state(end)
+        self.__update_state(start)
+        if start == end:
+            self.__best = 0.0
+            self.__meet = start
+        self.solved = False
+        self.no_path = False
+
+    # Best path found so far and current cell
+    def get_volatile_overlay(self):
+        res = []
+        if self.__meet is not None:
+            res.append(((0, 220, 100), self.get_path()))
+        if self.__current_cell is not None and not self.solved:
+            res.append(((100, 250, 150), [self.__current_cell]))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
+
+    # Path from end to start through meeting cell
+    def get_path(self):
+        if self.__meet is None:
+            return []
+        res = []
+        cur = self.__meet
+        while cur is not None:
+            res.append(cur)
+            cur = self.__parent[1].get(cur)
+        res.reverse()
+        cur = self.__parent[0].get(self.__meet)
+        while cur is not None:
+            res.append(cur)
+            cur = self.__parent[0].get(cur)
+        return res
+
+
+# Bidirectional Dijkstra
+# Bidirectional A* with zero heuristic
+class BiDijkstra(BiAstar):
+    def _heuristic(self, x, y, target):
+        return 0.0
+
+# Lifelong Planning A*
+# Keeps g and one step lookahead rhs costs of cells between edits. Edited walls
+# only make the cells around them inconsistent, and solving continues from those
+# cells instead of starting over. Each step makes one inconsistent cell consistent.
+# Moving start or end starts the search over.
+class LPAstar(Solver):
+    # Consistent cells in dark green, queued inconsistent cells in light green
+    STATE_COLORS = (None, (0, 150, 50), (0, 100, 25), None, None)
+
+    def __init__(self, name, grid: CellGrid):
+        super().__init__(name, grid)
+        self.__g = {}  # Cell -> g, missing cells have infinite cost
+        self.__rhs = {}  # Cell -> lowest g of neighbors plus move cost
+        self.__openset = PriorityQueue()  # Inconsistent cells
+        self.__start = None
+        self.__end = None
+        self.__current_cell = None
+
+    # Move costs have 6 decimals, rounding keeps float error out of key comparisons
+    def __key(self, cell):
+        g = min(self.__g.get(cell, math.inf), self.__rhs.get(cell, math.inf))
+        if g == math.inf:
+            return (g, g)
+        return (round(g + octile_cost(cell.x, cell.y, self.__end.x, self.__end.y), 6), round(g, 6))
+
+    # Recalculate rhs of cell from its neighbors and queue it if inconsistent
+    def __update_cell(self, cell):
+        if cell != self.__start:
+            rhs = math.inf
+            if self._grid.walkable(cell.x, cell.y):
+                for n_x, n_y, cost in octile_neighbors(self._grid, cell.x, cell.y):
+                    rhs = min(rhs, self.__g.get(self._grid.get_cell(n_x, n_y), math.inf) + cost)
+            if rhs < math.inf:
+                self.__rhs[cell] = rhs
+            else:
+                self.__rhs.pop(cell, None)
+        self.__queue(cell)
+
+    def __queue(self, cell):
+        if self.__g.get(cell, math.inf) != self.__rhs.get(cell, math.inf):
+            self.__openset.push(cell, self.__key(cell))
+        else:
+            self.__openset.remove(cell)
+        self.__update_state(cell)
+
+    def __update_state(self, cell):
+        if cell in self.__openset:
+            state = STATE_OPEN
+        elif cell in self.__g:
+            state = STATE_CLOSED
+        else:
+            state = STATE_NONE
+        self._set_state(cell, state)
+
+    def solve_step(self):
+        if self.solved or self.no_path:
+            return
+
+        end = self.__end
+        top = self.__openset.peek_priority()
+        if (top is None or top >= self.__key(end)) and self.__g.get(end, math.inf) == self.__rhs.get(end, math.inf):
+            if end in self.__g:
+                self.solved = True
+                logger.info("Found shortest path with %s! length: %d", self.name, len(self.get_path()))
+            else:
+                self.no_path = True
+                logger.info('No possible path!')
+            return
+
+        cell = self.__openset.pop()
+        self.__current_cell = cell
+        grid = self._grid
+        neighbors = octile_neighbors(grid, cell.x, cell.y)
+        self.stats.expanded += 1
+        self.stats.relaxed += len(neighbors)
+        if self.__g.get(cell, math.inf) > self.__rhs.get(cell, math.inf):
+            # Overconsistent, cost got lower and can only lower neighbor costs
+            g = self.__rhs[cell]
+            self.__g[cell] = g
+            for n_x, n_y, cost in neighbors:
+                nc = grid.get_cell(n_x, n_y)
+                if g + cost < self.__rhs.get(nc, math.inf) and nc != self.__start:
+                    self.__rhs[nc] = g + cost
+                    self.__queue(nc)
+        else:
+            # Underconsistent, cost got higher, neighbors that got their cost through cell are recalculated
+            g = self.__g.pop(cell)
+            self.__update_cell(cell)
+            for n_x, n_y, cost in neighbors:
+                nc = grid.get_cell(n_x, n_y)
+                if self.__rhs.get(nc) == g + cost:
+                    self.__update_cell(nc)
+        self.__update_state(cell)
+
+    # Cell and its 8 neighbors may have changed edges, diagonals depend on the straight cells next to them
+    def cell_edited(self, cell):
+        grid = self._grid
+        if grid.start_cell != self.__start or grid.end_cell != self.__end:
+            self.reset(grid)
+            return True
+        self.__update_cell(cell)
+        for dir_x, dir_y in [(1,0), (0,1), (-1,0), (0,-1), (1,1), (-1,1), (-1,-1), (1,-1)]:
+            if grid.in_bounds(cell.x + dir_x, cell.y + dir_y):
+                self.__update_cell(grid.get_cell(cell.x + dir_x, cell.y + dir_y))
+        if len(self.__openset) > 0:
+            self.solved = False
+            self.no_path = False
+        return False
+
+    # Cells with g or rhs are queued or consistent
+    def cell_in_use(self, cell):
+        return super().cell_in_use(cell) or cell == self._grid.start_cell or cell == self._grid.end_cell
+
+    def _queues(self):
+        return (self.__openset,)
+
+    def reset(self, grid):
+        self._grid = grid
+        self._reset_states()
+        self.__g = {}
+        self.__rhs = {}
+        self.__openset = PriorityQueue()
+        self.__start = grid.start_cell
+        self.__end = grid.end_cell
+        self.__current_cell = grid.start_cell
+        self.__rhs[self.__start] = 0.0
+        self.__openset.push(self.__start, self.__key(self.__start))
+        self.states[self.__start._idx] = STATE_OPEN
+        self.solved = False
+        self.no_path = False
+
+    def get_volatile_overlay(self):
+        res = []
+        if self.__end in self.__g:
+            res.append(((0, 220, 100), self.get_path()))
+        if not self.solved and self.__current_cell is not None:
+            res.append(((100, 250, 150), [self.__current_cell]))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
+
+    # Path from end to start following neighbors with lowest g plus move cost
+    def get_path(self):
+        if self.__end not in self.__g:
+            return []
+        res = [self.__end]
+        cur = self.__end
+        while cur != self.__start and len(res) <= len(self.__g):
+            best = None
+            best_g = math.inf
+            for n_x, n_y, cost in octile_neighbors(self._grid, cur.x, cur.y):
+                n = self._grid.get_cell(n_x, n_y)
+                g = self.__g.get(n, math.inf) + cost
+                if g < best_g:
+                    best = n
+                    best_g = g
+            if best is None:
+                break
+            res.append(best)
+            cur = best
+        return res
+# Flow field
+# Distance field from end over the whole grid, one wavefront per step, followed by a
+# flow field that gives every cell its next step towards end. Path is read from start.
+class FlowFieldSolver(Solver):
+    # State of reached cell is its distance band, colors repeat in bands of green
+    STATE_COLORS = (None,) + tuple((0, 90 + band * 4, 60 + band * 2) for band in range(32))
+
+    def __init__(self, name, grid: CellGrid):
+        super().__init__(name, grid)
+        self.__field = None
+        self.flow = None
+
+    def solve_step(self):
+        if self.solved or self.no_path:
+            return
+
+        if not self.__field.done:
+            self.stats.expanded += self.__field.frontier.size
+            changed = self.__field.step()
+            self.__update_states(changed)
+            return
+
+        self.flow = FlowField(self._grid, field=self.__field)
+        start = self._grid.start_cell
+        if np.isfinite(self.__field.distance_at(start.x, start.y)):
+            self.solved = True
+            logger.info("Found shortest path with %s! length: %d", self.name, len(self.get_path()))
+        else:
+            self.no_path = True
+            logger.info('No possible path!')
+
+    # Set states of cells from their distance, indices are padded field indices
+    def __update_states(self, indices):
+        xs, ys = self.__field.coordinates(indices)
+        bands = self.__field.distance[indices].astype(np.int64) % 32 + 1
+        np.frombuffer(self.states, dtype=np.uint8)[ys * self._grid.width + xs] = bands
+        if self._dirty is not None:
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                self._dirty.add(self._grid.get_cell(x, y))
+
+    def cell_in_use(self, cell):
+        return True
+
+    # Cells of current wavefront, states hold distance bands instead of open cells
+    def frontier_size(self):
+        return self.__field.frontier.size if self.__field is not None else 0
+
+    def reset(self, grid):
+        self._grid = grid
+        self._reset_states()
+        self.__field = DistanceField(grid)
+        self.__update_states(self.__field.frontier)
+        self.flow = None
+        self.solved = False
+        self.no_path = False
+
+    def get_volatile_overlay(self):
+        res = []
+        if self.solved:
+            res.append(((100, 250, 150), self.get_path()))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
+
+    def get_path(self):
+        if self.flow is None:
+            return []
+        start = self._grid.start_cell
+        return [self._grid.get_cell(x, y) for x, y in reversed(self.flow.path(start.x, start.y))]
+
+
+# Integer move weights of Dial solvers, DIAG_WEIGHT / STRAIGHT_WEIGHT is close to DIAG_COST
+STRAIGHT_WEIGHT = 10
+DIAG_WEIGHT = 14
+
+
+# Octile distance in move weights, consistent heuristic for them
+def octile_weight(x1, y1, x2, y2):
+    x = abs(x1 - x2)
+    y = abs(y1 - y2)
+    return min(x, y) * DIAG_WEIGHT + abs(x - y) * STRAIGHT_WEIGHT
+
+
+# A* with a bucket queue (Dial's algorithm) as open set
+# Moves cost small integer weights, scaled by terrain costs like in Astar, so f values
+# index a circular array of buckets and queue operations don't need a heap. f never
+# decreases with the consistent octile_weight heuristic, and a cell is queued at most
+# one move weight plus one heuristic step above the expanded cell. g costs in grid
+# search values are in move weights, STRAIGHT_WEIGHT per straight move on floor.
+class DialAstar(Solver):
+    # Closedset in dark amber, openset in amber
+    STATE_COLORS = (None, (210, 160, 40), (150, 100, 20), None, None)
+
+    # Highest f step of one move, longest weighted move and its heuristic change
+    SPAN = DIAG_WEIGHT * TERRAIN_MAX + DIAG_WEIGHT
+
+    def __init__(self, name, grid: CellGrid):
+        super().__init__(name, grid)
+        self.__openset = BucketQueue(self.SPAN)
+        self.__expanded = array('i')  # Closed cells of current run, for resetting them
+        self.__current_cell = None
+
+    def _heuristic(self, x, y, target):
+        return octile_weight(x, y, target.x, target.y)
+
+    def solve_step(self):
+        if self.solved or self.no_path:
+            return
+
+        if self.__current_cell == self._grid.end_cell:
+            logger.info("Found path with %s! length: %d, cost: %.1f", self.name, len(self._grid.get_path(self.__current_cell)),
+                        self.__current_cell.g / STRAIGHT_WEIGHT)
+            self.solved = True
+            return
+
+        idx = self.__openset.pop()
+        if idx is None:
+            self.no_path = True
+            logger.info('No possible path!')
+            return
+
+        grid = self._grid
+        self.__expanded.append(idx)
+        self.__current_cell = grid.get_cell_by_index(idx)
+        self._set_state(self.__current_cell, STATE_CLOSED)
+
+        states = self.states
+        g_costs, previous = (grid._g, grid._previous)
+        costs = grid._costs
+        end = grid.end_cell
+        c_x, c_y = (self.__current_cell.x, self.__current_cell.y)
+        cur_g = int(g_costs[idx])
+        moves = grid.moves(idx)
+        self.stats.expanded += 1
+        self.stats.relaxed += len(moves)
+        for offset, dx, dy, _ in moves:
+            n_idx = idx + offset
+            if states[n_idx] == STATE_CLOSED:
+                continue
+            weight = DIAG_WEIGHT if dx != 0 and dy != 0 else STRAIGHT_WEIGHT
+            if costs is not None:
+                # Both weights are even, so the mean terrain cost keeps them integers
+                weight = weight * (costs[idx] + costs[n_idx]) // 2
+            g = cur_g + weight
+            if g < g_costs[n_idx]:
+                g_costs[n_idx] = g
+                previous[n_idx] = idx
+                self.__openset.push(n_idx, g + self._heuristic(c_x + dx, c_y + dy, end))
+                states[n_idx] = STATE_OPEN
+                if self._dirty is not None:
+                    self._dirty.add(grid.get_cell_by_index(n_idx))
+
+    def cell_in_use(self, cell):
+        return super().cell_in_use(cell) or cell == self._grid.start_cell or cell == self._grid.end_cell
+
+    def _queues(self):
+        return (self.__openset,)
+
+    def reset(self, grid):
+        self._grid = grid
+        self._reset_search(grid, itertools.chain(self.__expanded, self.__openset))
+        self.__openset = BucketQueue(self.SPAN)
+        self.__expanded = array('i')
+        self.__current_cell = grid.start_cell
+        self.__current_cell.g = 0
+        # Start is queued with its own f, later cells are within SPAN of it
+        self.__openset.push(self.__current_cell._idx, self._heuristic(self.__current_cell.x, self.__current_cell.y, grid.end_cell))
+        self.states[self.__current_cell._idx] = STATE_OPEN
+        self.solved = False
+        self.no_path = False
+
+    def get_volatile_overlay(self):
+        res = []
+        if self.solved or len(self.__openset) > 0:
+            res.append(((240, 200, 80), self._grid.get_path(self.__current_cell)))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
 
     def get_path(self):
         return self._grid.get_path(self.__current_cell)
 
 
+# Dijkstra on the bucket queue of DialAstar
+# DialAstar with zero heuristic
+class Dial(DialAstar):
+    def _heuristic(self, x, y, target):
+        return 0
+
+
+###############################################################
+#####             HIERARCHICAL PATHFINDING                #####
+###############################################################
+
+# Cells per cluster side
+CLUSTER_SIZE = 16
+
+# Entrances shorter than this get one transition in the middle, longer ones one at each end
+MIN_DOUBLE_ENTRANCE = 6
+
+
+# Abstraction of CellGrid for HPA*
+# Grid is split into square clusters. Runs of free cells on both sides of a cluster
+# border are entrances, and transition cells picked from them are the nodes of the
+# abstract graph. Nodes of a cluster are connected by their shortest distances
+# inside the cluster, transitions across a border by a straight move.
+# Borders and cluster edges are built when a search first needs them and kept until
+# a cell of the cluster changes. Walkability is compared to a snapshot on sync, so
+# edits made while nobody was listening are picked up too.
+class ClusterGraph:
+    def __init__(self, grid: CellGrid, cluster_size=CLUSTER_SIZE):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.columns = (grid.width + cluster_size - 1) // cluster_size
+        self.rows = (grid.height + cluster_size - 1) // cluster_size
+        self.__borders = {}  # (cx, cy, bottom) -> [(cell idx, cell idx)] transitions to right or bottom cluster
+        self.__clusters = {}  # (cx, cy) -> node idx -> [(node idx, cost)]
+        self.__walls = bytearray(bytes(grid._types).translate(WALL_FLAGS))  # Wall flags at last sync
+        self.__edits = grid.log_type_edits()  # Cells edited since last sync
+
+    def cluster_of(self, idx):
+        width = self.grid.width
+        return ((idx % width) // self.cluster_size, (idx // width) // self.cluster_size)
+
+    def __bounds(self, cx, cy):
+        c = self.cluster_size
+        return (cx * c, cy * c, min(self.grid.width, (cx + 1) * c), min(self.grid.height, (cy + 1) * c))
+
+    # Bounds covering clusters of cells a and b
+    def __union_bounds(self, a, b):
+        a_x0, a_y0, a_x1, a_y1 = self.__bounds(*self.cluster_of(a))
+        b_x0, b_y0, b_x1, b_y1 = self.__bounds(*self.cluster_of(b))
+        return (min(a_x0, b_x0), min(a_y0, b_y0), max(a_x1, b_x1), max(a_y1, b_y1))
+
+    # Clusters inside bounds of local search from a to b
+    def local_clusters(self, a, b):
+        a_cx, a_cy = self.cluster_of(a)
+        b_cx, b_cy = self.cluster_of(b)
+        return [(cx, cy) for cx in range(min(a_cx, b_cx), max(a_cx, b_cx) + 1)
+                for cy in range(min(a_cy, b_cy), max(a_cy, b_cy) + 1)]
+
+    # Check if cells are in the same or touching clusters
+    def near(self, a, b):
+        a_cx, a_cy = self.cluster_of(a)
+        b_cx, b_cy = self.cluster_of(b)
+        return abs(a_cx - b_cx) <= 1 and abs(a_cy - b_cy) <= 1
+
+    # Drop cached data depending on cell at x, y
+    def invalidate(self, x, y):
+        cx, cy = (x // self.cluster_size, y // self.cluster_size)
+        for key in [(cx, cy, 0), (cx, cy, 1), (cx - 1, cy, 0), (cx, cy - 1, 1)]:
+            self.__borders.pop(key, None)
+        for key in [(cx, cy), (cx + 1, cy), (cx - 1, cy), (cx, cy + 1), (cx, cy - 1)]:
+            self.__clusters.pop(key, None)
+        idx = y * self.grid.width + x
+        self.__walls[idx] = not self.grid.walkable(x, y)
+
+    # Invalidate clusters whose walls changed since last sync
+    # Only edited cells are checked, whole grid is compared after its types were replaced
+    def sync(self):
+        width = self.grid.width
+        edited = self.__edits.pop()
+        if edited is not None:
+            walkable = self.grid.walkable
+            for idx in edited:
+                x, y = (idx % width, idx // width)
+                if self.__walls[idx] != (not walkable(x, y)):
+                    self.invalidate(x, y)
+            return
+        walls = bytes(self.grid._types).translate(WALL_FLAGS)
+        cur = memoryview(walls)
+        old = memoryview(self.__walls)
+        for y in range(self.grid.height):
+            row = y * width
+            if cur[row:row + width] != old[row:row + width]:
+                for x in range(width):
+                    if cur[row + x] != old[row + x]:
+                        self.invalidate(x, y)
+        self.__walls = bytearray(walls)
+
+    # Transitions of border to right (bottom False) or bottom neighbor of cluster
+    def __border(self, cx, cy, bottom):
+        key = (cx, cy, bottom)
+        if key in self.__borders:
+            return self.__borders[key]
+        res = []
+        if cx >= 0 and cy >= 0 and (cy + 1 < self.rows if bottom else cx + 1 < self.columns):
+            width = self.grid.width
+            walkable = self.grid.walkable
+            x0, y0, x1, y1 = self.__bounds(cx, cy)
+            # Cells (a, b) on both sides of border for each step along it
+            if bottom:
+                pairs = [((x, y1 - 1), (x, y1)) for x in range(x0, x1)]
+            else:
+                pairs = [((x1 - 1, y), (x1, y)) for y in range(y0, y1)]
+            run = []
+            for pair in pairs + [None]:
+                if pair is not None and walkable(*pair[0]) and walkable(*pair[1]):
+                    (a_x, a_y), (b_x, b_y) = pair
+                    run.append((a_y * width + a_x, b_y * width + b_x))
+                    continue
+                if len(run) >= MIN_DOUBLE_ENTRANCE:
+                    res.append(run[0])
+                    res.append(run[-1])
+                elif run:
+                    res.append(run[len(run) // 2])
+                run = []
+        self.__borders[key] = res
+        return res
+
+    # Node idx -> [(node idx, cost)] of cluster, includes transitions out of cluster
+    def __cluster(self, cx, cy):
+        key = (cx, cy)
+        if key in self.__clusters:
+            return self.__clusters[key]
+        edges = {}
+        for a, b in self.__border(cx, cy, False) + self.__border(cx, cy, True):
+            edges.setdefault(a, []).append((b, 1.0))
+        for a, b in self.__border(cx - 1, cy, False) + self.__border(cx, cy - 1, True):
+            edges.setdefault(b, []).append((a, 1.0))
+        nodes = list(edges)
+        x0, y0, x1, y1 = self.__bounds(cx, cy)
+        w = x1 - x0
+        width = self.grid.width
+        local = [(idx // width - y0) * w + idx % width - x0 for idx in nodes]
+        adjacency = self.__adjacency(x0, y0, x1, y1)
+        # Distances are symmetric, each node searches only nodes after it
+        for i, node in enumerate(nodes):
+            dist = self.__distances(adjacency, local[i], set(local[i + 1:]))
+            for j in range(i + 1, len(nodes)):
+                d = dist[local[j]]
+                if d < math.inf:
+                    edges[node].append((nodes[j], d))
+                    edges[nodes[j]].append((node, d))
+        self.__clusters[key] = edges
+        return edges
+
+    # Moves inside bounds as list of [(local idx, cost)] by local cell index
+    def __adjacency(self, x0, y0, x1, y1):
+        w = x1 - x0
+        res = []
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                res.append([((n_y - y0) * w + n_x - x0, cost) for n_x, n_y, cost in octile_neighbors(self.grid, x, y)
+                            if x0 <= n_x < x1 and y0 <= n_y < y1])
+        return res
+
+    # Dijkstra over adjacency from local cell until targets are reached
+    @staticmethod
+    def __distances(adjacency, source, targets):
+        dist = [math.inf] * len(adjacency)
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        remaining = len(targets)
+        while heap and remaining:
+            d, i = heapq.heappop(heap)
+            if d > dist[i]:
+                continue
+            if i in targets:
+                remaining -= 1
+            for j, cost in adjacency[i]:
+                if d + cost < dist[j]:
+                    dist[j] = d + cost
+                    heapq.heappush(heap, (d + cost, j))
+        return dist
+
+    # Abstract edges of node, empty for cells that are not transitions
+    def neighbors(self, idx):
+        return self.__cluster(*self.cluster_of(idx)).get(idx, [])
+
+    # Distances from cell to nodes of its cluster
+    def node_distances(self, idx):
+        cx, cy = self.cluster_of(idx)
+        nodes = set(self.__cluster(cx, cy))
+        dist, _ = self.search(idx, self.__bounds(cx, cy), nodes)
+        return {node: d for node, d in dist.items() if node in nodes}
+
+    # Dijkstra from cell idx inside cluster bounds until all targets are reached
+    # Single target is searched with A*
+    # Returns dicts of cell idx -> distance and cell idx -> previous idx
+    def search(self, source, bounds, targets):
+        width = self.grid.width
+        x0, y0, x1, y1 = bounds
+        dist = {source: 0.0}
+        parent = {}
+        done = set()
+        remaining = set(targets)
+        remaining.discard(source)
+        goal = next(iter(remaining)) if len(remaining) == 1 else None
+        queue = PriorityQueue()
+        queue.push(source, 0.0)
+        while remaining:
+            idx = queue.pop()
+            if idx is None:
+                break
+            done.add(idx)
+            remaining.discard(idx)
+            d = dist[idx]
+            for n_x, n_y, cost in octile_neighbors(self.grid, idx % width, idx // width):
+                if not (x0 <= n_x < x1 and y0 <= n_y < y1):
+                    continue
+                n_idx = n_y * width + n_x
+                if n_idx not in done and d + cost < dist.get(n_idx, math.inf):
+                    dist[n_idx] = d + cost
+                    parent[n_idx] = idx
+                    h = 0.0 if goal is None else octile_cost(n_x, n_y, goal % width, goal // width)
+                    queue.push(n_idx, d + cost + h)
+        return dist, parent
+
+    # Shortest distance from a to b inside their clusters, None if b can't be reached
+    def local_distance(self, a, b):
+        dist, _ = self.search(a, self.__union_bounds(a, b), [b])
+        return dist.get(b)
+
+    # Shortest cells from a to b inside their clusters, both ends included
+    def local_path(self, a, b):
+        _, parent = self.search(a, self.__union_bounds(a, b), [b])
+        res = [b]
+        while res[-1] != a:
+            res.append(parent[res[-1]])
+        res.reverse()
+        return res
+
+
+# Wall flag of each cell type value, for comparing walls of whole grid at once
+WALL_FLAGS = bytes.maketrans(bytes(range(len(CELL_TYPES))), bytes(int(t == CellType.WALL) for t in CELL_TYPES))
+
+
+# Hierarchical path-finding A*
+# Searches the cluster graph with start and end connected to the nodes of their
+# clusters, then refines abstract edges on the found path to cells one by one.
+# Graph is kept between resets, so later queries only build clusters they reach
+# for the first time. Paths are near optimal, cost divided by octile distance is
+# logged as an upper bound of how far from optimal the path can be.
+class HPAstar(Solver):
+    # Abstract nodes in greens
+    STATE_COLORS = (None, (0, 150, 50), (0, 100, 25), None, None)
+
+    def __init__(self, name, grid: CellGrid):
+        super().__init__(name, grid)
+        self.__graph = None
+        self.__g = {}  # Node idx -> g
+        self.__parent = {}  # Node idx -> previous node idx
+        self.__openset = PriorityQueue()
+        self.__clusters_used = set()
+        self.__start_edges = []
+        self.__end_edges = {}
+        self.__segments = []  # Abstract path edges waiting for refinement
+        self.__path = []  # Refined cells from start
+        self.suboptimality = None
+
+    def solve_step(self):
+        if self.solved or self.no_path:
+            return
+
+        if self.__segments:
+            self.__refine()
+            return
+
+        grid = self._grid
+        s_idx, e_idx = (grid.start_cell._idx, grid.end_cell._idx)
+        cur = self.__openset.pop()
+        if cur is None:
+            self.no_path = True
+            logger.info('No possible path!')
+            return
+        self._set_state(grid.get_cell_by_index(cur), STATE_CLOSED)
+        if cur == e_idx:
+            nodes = [cur]
+            while nodes[-1] != s_idx:
+                nodes.append(self.__parent[nodes[-1]])
+            nodes.reverse()
+            self.__segments = list(zip(nodes, nodes[1:]))
+            self.__path = [s_idx]
+            if not self.__segments:
+                self.__refine()
+            return
+
+        edges = self.__start_edges if cur == s_idx else self.__graph.neighbors(cur)
+        if cur in self.__end_edges:
+            edges = edges + [(e_idx, self.__end_edges[cur])]
+        self.stats.expanded += 1
+        self.stats.relaxed += len(edges)
+        width = grid.width
+        end = grid.end_cell
+        cur_g = self.__g[cur]
+        for n_idx, cost in edges:
+            if self.states[n_idx] == STATE_CLOSED or n_idx == cur:
+                continue
+            g = cur_g + cost
+            if g < self.__g.get(n_idx, math.inf):
+                self.__g[n_idx] = g
+                self.__parent[n_idx] = cur
+                self.__clusters_used.add(self.__graph.cluster_of(n_idx))
+                h = octile_cost(n_idx % width, n_idx // width, end.x, end.y)
+                self.__openset.push(n_idx, (g + h, h))
+                self._set_state(grid.get_cell_by_index(n_idx), STATE_OPEN)
+
+    # Refine first abstract edge in queue to cells
+    def __refine(self):
+        grid = self._grid
+        if self.__segments:
+            a, b = self.__segments.pop(0)
+            cells = self.__graph.local_path(a, b)
+            self.__path.extend(cells[1:])
+            for idx in cells:
+                self._touch(grid.get_cell_by_index(idx))
+        if not self.__segments:
+            self.solved = True
+            cost = self.__g[grid.end_cell._idx]
+            lower = octile_cost(grid.start_cell.x, grid.start_cell.y, grid.end_cell.x, grid.end_cell.y)
+            self.suboptimality = cost / lower if lower > 0 else 1.0
+            logger.info("Found path with %s! length: %d, cost %.2f, at most %.3f times optimal",
+                        self.name, len(self.__path), cost, self.suboptimality)
+
+    # Edits only drop clusters they touch, search starts over if it used the cluster
+    def cell_edited(self, cell):
+        self.__graph.invalidate(cell.x, cell.y)
+        return super().cell_edited(cell)
+
+    def cell_in_use(self, cell):
+        return (self.__graph.cluster_of(cell._idx) in self.__clusters_used
+                or cell == self._grid.start_cell or cell == self._grid.end_cell)
+
+    def _queues(self):
+        return (self.__openset,)
+
+    def reset(self, grid):
+        self._grid = grid
+        self._reset_states()
+        if self.__graph is None or self.__graph.grid is not grid:
+            self.__graph = ClusterGraph(grid)
+        else:
+            self.__graph.sync()
+        graph = self.__graph
+        s_idx, e_idx = (grid.start_cell._idx, grid.end_cell._idx)
+        self.__g = {s_idx: 0.0}
+        self.__parent = {}
+        self.__openset = PriorityQueue()
+        self.__openset.push(s_idx, (0, 0))
+        self.states[s_idx] = STATE_OPEN
+        self.__clusters_used = {graph.cluster_of(s_idx), graph.cluster_of(e_idx)}
+        self.__segments = []
+        self.__path = []
+        self.suboptimality = None
+
+        # Start and end are connected to nodes of their clusters, and to each other if their clusters touch
+        # End on a wall can't be reached, like with Astar
+        end_free = grid.walkable(grid.end_cell.x, grid.end_cell.y)
+        self.__start_edges = list(graph.node_distances(s_idx).items()) + graph.neighbors(s_idx)
+        if end_free and graph.near(s_idx, e_idx):
+            # Direct edge is searched in all clusters around start and end, also diagonal neighbors
+            self.__clusters_used.update(graph.local_clusters(s_idx, e_idx))
+            dist = graph.local_distance(s_idx, e_idx)
+            if dist is not None:
+                self.__start_edges.append((e_idx, dist))
+        self.__end_edges = graph.node_distances(e_idx) if end_free else {}
+        self.solved = False
+        self.no_path = False
+
+    def get_volatile_overlay(self):
+        res = []
+        if self.__path:
+            res.append(((0, 220, 100), self.get_path()))
+        res.append((None, [self._grid.start_cell, self._grid.end_cell]))
+        return res
+
+    # Refined path from end to start
+    def get_path(self):
+        return [self._grid.get_cell_by_index(idx) for idx in reversed(self.__path)]
+
+
 ###############################################################
 #####              MAZEGENERATOR SOLVERS                  #####
 ###############################################################
@@ -418,87 +1573,131 @@ def get_cell_in_between(grid: CellGrid, c1, c2):
     return grid.get_cell(c2.x + x_off, c2.y + y_off)
 
 
+# Indices of cells two steps away inside border walls, same order as get_neighbors
+def maze_neighbors(grid: CellGrid, idx):
+    width = grid.width
+    x, y = (idx % width, idx // width)
+    res = []
+    if x + 2 <= width - 2:
+        res.append(idx + 2)
+    if y + 2 <= grid.height - 2:
+        res.append(idx + 2 * width)
+    if x - 2 >= 1:
+        res.append(idx - 2)
+    if y - 2 >= 1:
+        res.append(idx - 2 * width)
+    return res
+
+
 # Prim's algorithm
+# Frontier is a list, random cell is taken out by moving last cell in its place.
+# Frontier cells are open and maze cells closed in solver states.
 class PrimGenerator(Solver):
+    # Maze todo list in green
+    STATE_COLORS = (None, (0, 200, 40), None, None, None)
+
     def __init__(self, name, grid: CellGrid):
         super().__init__(name, grid)
-        self.__maze_todo = set()
-        self.__visited = set()
+        self.__maze_todo = []
 
     # Reset maze generating
     def reset(self, grid):
         self._grid = grid
-        self.__maze_todo = set()
-        self.__visited = set()
+        self.__maze_todo = []
+        self._reset_states()
         self._grid.set_cell_type_forall(CellType.WALL)
         # Get first cell by random
         cell = self._grid.start_cell
         cell.type = CellType.FLOOR
-        self.__visited.add(cell)
-        # Get neighbors of the first cell and add them to todo set
-        c_x, c_y = (cell.x, cell.y)
-        for c in self._grid.get_neighbors(c_x, c_y, 2):
-            self.__maze_todo.add(c)
-        self.solved = False
-
-    def show(self, surface):
-        # Draw maze todo set
-        for c in self.__maze_todo:
-            c.show(surface, (0,200, 40))
+        self.states[cell._idx] = STATE_CLOSED
+        # Get neighbors of the first cell and add them to todo list
+        for idx in maze_neighbors(grid, cell._idx):
+            if not self.states[idx]:
+                self.states[idx] = STATE_OPEN
+                self.__maze_todo.append(idx)
+        self.solved = not self.__maze_todo
+
+    # Take random cell from todo list and pick random maze cell next to it,
+    # cells around it are added to todo list
+    # Returns index of taken cell, index of wall between it and the maze cell
+    # or None if there was none, and indices added to todo list
+    def __take(self):
+        todo = self.__maze_todo
+        state = self.states
+        types = self._grid._types
+        k = random.randrange(len(todo))
+        idx = todo[k]
+        todo[k] = todo[-1]
+        todo.pop()
+        state[idx] = STATE_CLOSED
+
+        around = maze_neighbors(self._grid, idx)
+        nbrs = [i for i in around if types[i] != WALL_VALUE]
+        if not nbrs:
+            return idx, None, ()
+        rand_nbr = nbrs[random.randint(0, len(nbrs) - 1)]
+        added = [i for i in around if not state[i]]
+        for i in added:
+            state[i] = STATE_OPEN
+        todo.extend(added)
+        return idx, (idx + rand_nbr) // 2, added
 
     def solve_step(self):
-        if self.solved and len(self.__maze_todo) == 0:
+        if self.solved:
             return
 
-        #if len(self.__maze_todo) > 0:
-        # Get random cell from todo set
-        cell = random.choice(list(self.__maze_todo))
-        self.__visited.add(cell)
-
-        # Get neighbors around our current cell
-        nbrs = self._grid.get_neighbors(cell.x, cell.y, 2)
-        nbrs = [x for x in nbrs if self._grid.in_bounds(x.x, x.y, 1) and x.type != CellType.WALL]
-        
-        if len(nbrs) > 0:
-            rand_nbr = nbrs[random.randint(0, len(nbrs)-1)]
-            if self._grid.in_bounds(cell.x, cell.y, 1):
-                nbr_nbrs = self._grid.get_neighbors(cell.x, cell.y, 2)
-                for nbr in nbr_nbrs:
-                    if self._grid.in_bounds(nbr.x, nbr.y, 1) and nbr not in self.__maze_todo and nbr not in self.__visited:
-                        self.__maze_todo.add(nbr)
-                cell.type = CellType.FLOOR
-                # Set cell in between to floor
-                get_cell_in_between(self._grid, cell, rand_nbr).type = CellType.FLOOR
-                
-        self.__maze_todo.remove(cell)
+        idx, between, added = self.__take()
+        grid = self._grid
+        cell = grid.get_cell_by_index(idx)
+        if between is not None:
+            cell.type = CellType.FLOOR
+            # Set cell in between to floor
+            grid.get_cell_by_index(between).type = CellType.FLOOR
+        for i in added:
+            self._touch(grid.get_cell_by_index(i))
+        self._touch(cell)
 
         if not self.__maze_todo:
             self.solved = True
-    
-    def cell_in_use(self, cell):
-        return cell in self.__maze_todo or cell in self.__visited
 
-    def get_cells_in_use(self):
-        return []
+    # Same maze as solve_step, without cell views and overlay updates
+    def solve_all(self):
+        if self.solved:
+            return
+        start = time.perf_counter()
+        types = self._grid._types
+        steps = 0
+        while self.__maze_todo:
+            idx, between, _ = self.__take()
+            if between is not None:
+                types[idx] = FLOOR_VALUE
+                types[between] = FLOOR_VALUE
+            steps += 1
+            if steps % STOP_CHECK_INTERVAL == 0 and self._stop_requested():
+                break
+        self._grid.types_changed()
+        self._touch_all()
+        self.solved = not self.__maze_todo
+        self.stats.add_steps(0, time.perf_counter() - start)
 
     def get_path(self):
         pass
 
 
 class BackTrackGenerator(Solver):
+    # Cells on stack and cells in between them in green
+    STATE_COLORS = (None, (0, 150, 50), None, None, None)
+
     def __init__(self, name, grid: CellGrid):
         super().__init__(name, grid)
         self.__stack = deque()
         self.__stack_cib = deque()  # Only for rendering, holds cells in between
         self.__current_cell = None
 
-    def show(self, surface):
-        for c in self.__stack:
-            c.show(surface,  (0, 150, 50))
-        for c in self.__stack_cib:
-            c.show(surface, (0, 150, 50))
+    def get_volatile_overlay(self):
         if self.__current_cell:
-            self.__current_cell.show(surface, (0, 200, 50))
+            return [((0, 200, 50), [self.__current_cell])]
+        return []
 
     def solve_step(self):
         if len(self.__stack) == 0:
@@ -515,41 +1714,42 @@ class BackTrackGenerator(Solver):
             self.__current_cell = nbr
             self.__stack.append(self.__current_cell)
             self.__stack_cib.append(cib)
+            self._set_state(nbr, STATE_OPEN)
+            self._set_state(cib, STATE_OPEN)
         else:
             self.__current_cell = self.__stack.pop()
+            self._set_state(self.__current_cell, STATE_NONE)
             if len(self.__stack_cib) > 0:
-                self.__stack_cib.pop()
+                cib = self.__stack_cib.pop()
+                self._set_state(cib, STATE_NONE)
 
     def reset(self, grid):
         self._grid = grid
+        self._reset_states()
         self.__stack = deque()
         self.__stack_cib = deque()
         self.__current_cell = self._grid.start_cell
         self.__stack.append(self.__current_cell)
+        self.states[self.__current_cell._idx] = STATE_OPEN
         self._grid.set_cell_type_forall(CellType.WALL)
         self.__current_cell.type = CellType.FLOOR
         self.solved = False
 
-    def cell_in_use(self, cell):
-        return cell in self.__stack
-
     def get_path(self):
         pass
 
-    def get_cells_in_use(self):
-        return []
-
 # Divide and Conquer algorithm
+# Cells of areas waiting in queue to be divided are open in solver states
 class DNQGenerator(Solver):
     def __init__(self, name, grid: CellGrid):
         super().__init__(name, grid)
         self.__que = deque()
         self.__current_pos = None
 
-    def show(self, surface):
+    def get_volatile_overlay(self):
         if not self.solved and self.__current_pos:
-            for c in self.__get_cells(self.__current_pos[0], self.__current_pos[1]):
-                c.show(surface, (0, 150, 40))
+            return [((0, 150, 40), self.__get_cells(self.__current_pos[0], self.__current_pos[1]))]
+        return []
 
     def __get_cells(self, pos1, pos2):
         res = []
@@ -584,17 +1784,22 @@ class DNQGenerator(Solver):
             mx += dx
             my += dy
         self._grid.get_cell(fx, fy).type = CellType.FLOOR
+        self._fill_states(first[0], first[1], w if horizontal else 1, 1 if horizontal else h, STATE_NONE)
 
         nx, ny = (x, my + 1) if horizontal else (mx + 1, y)
         nw, nh = (w, y + h - my - 1) if horizontal else (x + w - mx - 1, h)
         if nw > 2 and nh > 2:
             self.__que.append((nx, ny, nw, nh))
+        else:
+            self._fill_states(nx, ny, nw, nh, STATE_NONE)
         logger.debug("nxy2 (%d, %d) nwh(%d, %d)", nx, ny, nw, nh)
 
         nx, ny = (x, y)
         nw, nh = (w, my - y) if horizontal else (mx - x , h)
         if nw > 2 and nh > 2:
             self.__que.append((nx, ny, nw, nh))
+        else:
+            self._fill_states(nx, ny, nw, nh, STATE_NONE)
         logger.debug("nxy1 (%d, %d) nwh(%d, %d)", nx, ny, nw, nh)
 
         if len(self.__que) == 0:
@@ -614,105 +1819,150 @@ class DNQGenerator(Solver):
 
     def reset(self, grid):
         self._grid = grid
+        self._reset_states()
         self.__que = deque()
         self._grid.set_cell_type_forall(CellType.FLOOR)
         # Set edges to WALL
-        for i in range(0, self._grid.size):
+        w, h = (self._grid.width, self._grid.height)
+        for i in range(0, w):
             self._grid.set_cell_type(i, 0, CellType.WALL)
+            self._grid.set_cell_type(i, h - 1, CellType.WALL)
+        for i in range(0, h):
             self._grid.set_cell_type(0, i, CellType.WALL)
-            self._grid.set_cell_type(self._grid.size - 1, i, CellType.WALL)
-            self._grid.set_cell_type(i, self._grid.size - 1, CellType.WALL)
-        self.__que.append((1, 1, self._grid.size-2, self._grid.size-2))
+            self._grid.set_cell_type(w - 1, i, CellType.WALL)
+        self.__que.append((1, 1, w-2, h-2))
+        self._fill_states(1, 1, w-2, h-2, STATE_OPEN)
         self.solved = False
         self.__current_pos = None
 
-    def cell_in_use(self, cell):
-        return cell in self.__que
-
     def get_path(self):
         pass
 
-    def get_cells_in_use(self):
-        return []
-
 
+# Hunt and kill
+# Unvisited cells next to visited ones are kept in a heap of cell indices, so the
+# first one in row order is found without scanning. Heap entries that got visited
+# or are above the hunted row are dropped when they come up.
 class HuntAndKill(Solver):
     def __init__(self, name, grid: CellGrid):
         super().__init__(name, grid)
-        self.__visited = set()
+        self.__hunt = []
         self.__current_cell = None
         self.__cur_y = 1
 
     def reset(self, grid):
         self._grid = grid
-        self.__visited = set()
+        self._reset_states()
+        self.__hunt = []
         self.__current_cell = self._grid.get_cell(1, 1)
         self._grid.set_cell_type_forall(CellType.WALL)
         self.__current_cell.type = CellType.FLOOR
         self.__cur_y = 1
         self.solved = False
 
-    def show(self, surface):
+    def get_volatile_overlay(self):
+        res = []
         if not self.solved and self.__current_cell == None:
-            for i in range(1, self._grid.size-2):
-                c = self._grid.get_cell(i, self.__cur_y)
-                c.show(surface, (0, 180, 50))
+            res.append(((0, 180, 50), [self._grid.get_cell(i, self.__cur_y) for i in range(1, self._grid.width-2)]))
         if self.__current_cell != None:
-            self.__current_cell.show(surface, (20, 250, 40))
+            res.append(((20, 250, 40), [self.__current_cell]))
+        return res
 
+    # Visited cells are closed in solver states
+    def __visit(self, idx):
+        self.states[idx] = STATE_CLOSED
+        for i in maze_neighbors(self._grid, idx):
+            if not self.states[i]:
+                heapq.heappush(self.__hunt, i)
+
+    # Random walk from cell to random unvisited neighbor
+    # Returns (neighbor, cell in between) or None in dead end
+    def __walk(self, idx):
+        types = self._grid._types
+        nbrs = [i for i in maze_neighbors(self._grid, idx) if not self.states[i] and types[i] == WALL_VALUE]
+        self.__visit(idx)
+        if len(nbrs) == 0:
+            return None
+        r_nbr = nbrs[random.randint(0, len(nbrs)-1)]
+        return r_nbr, (idx + r_nbr) // 2
+
+    # First unvisited cell next to visited ones from hunted row onwards,
+    # joined to random visited neighbor
+    # Returns (cell, cell in between) or None when maze is done
     def __hunt_new_current(self):
-        for j in range(self.__cur_y, self._grid.size-1, 2):
-            for i in range(1, self._grid.size-1, 2):
-                c = self._grid.get_cell(i, j)
-                if c in self.__visited:
-                    continue
-
-                nbrs = self._grid.get_neighbors(i, j, 2)
-                nbrs = [c for c in nbrs if c in self.__visited]
-                if len(nbrs) == 0:
-                    continue
-                
-                r_nbr = nbrs[random.randint(0, len(nbrs)-1)]
-                c.type = CellType.FLOOR
-                get_cell_in_between(self._grid, r_nbr, c).type = CellType.FLOOR
-                self.__current_cell = c
-                self.__cur_y = j
-                return c
-        return None
+        width = self._grid.width
+        hunt = self.__hunt
+        visited = self.states
+        first = self.__cur_y * width
+        while hunt and (visited[hunt[0]] or hunt[0] < first):
+            heapq.heappop(hunt)
+        if not hunt:
+            return None
+
+        idx = hunt[0]
+        nbrs = [i for i in maze_neighbors(self._grid, idx) if visited[i]]
+        r_nbr = nbrs[random.randint(0, len(nbrs)-1)]
+        self.__cur_y = idx // width
+        return idx, (idx + r_nbr) // 2
 
     # Random walk
     # or Hunt next spot
     def solve_step(self):
         if self.__current_cell != None:
-            nbrs = self._grid.get_neighbors(self.__current_cell.x, self.__current_cell.y, 2)
-            nbrs = [c for c in nbrs if c not in self.__visited and c.type == CellType.WALL and self._grid.in_bounds(c.x, c.y, 1)]
-
-            if len(nbrs) > 0:
-                # Random walk
-                r_nbr = nbrs[random.randint(0, len(nbrs)-1)]
-                r_nbr.type = CellType.FLOOR
-                get_cell_in_between(self._grid, self.__current_cell, r_nbr).type = CellType.FLOOR
-                self.__visited.add(self.__current_cell)
-                self.__current_cell = r_nbr
-            else:
-                self.__visited.add(self.__current_cell)
-                self.__current_cell = None
-
+            res = self.__walk(self.__current_cell._idx)
         elif not self.solved:
-            c = self.__hunt_new_current()
-            if c == None:
+            res = self.__hunt_new_current()
+            if res == None:
                 logger.info("Generated maze with Hunt and Kill!")
                 self.solved = True
+        else:
+            return
+
+        if res != None:
+            idx, between = res
+            self.__current_cell = self._grid.get_cell_by_index(idx)
+            self.__current_cell.type = CellType.FLOOR
+            self._grid.get_cell_by_index(between).type = CellType.FLOOR
+        else:
+            self.__current_cell = None
+
+    # Same maze as solve_step, without cell views
+    def solve_all(self):
+        if self.solved:
+            return
+        start = time.perf_counter()
+        types = self._grid._types
+        idx = self.__current_cell._idx if self.__current_cell != None else None
+        steps = 0
+        while True:
+            res = self.__walk(idx) if idx != None else self.__hunt_new_current()
+            if res != None:
+                idx, between = res
+                types[idx] = FLOOR_VALUE
+                types[between] = FLOOR_VALUE
+            elif idx != None:
+                idx = None
+            else:
+                break
+            steps += 1
+            if steps % STOP_CHECK_INTERVAL == 0 and self._stop_requested():
+                # Walk goes on from current cell in next solve
+                self.__current_cell = self._grid.get_cell_by_index(idx) if idx != None else None
+                self._grid.types_changed()
+                self.stats.add_steps(0, time.perf_counter() - start)
+                return
+        logger.info("Generated maze with Hunt and Kill!")
+        self.__current_cell = None
+        self._grid.types_changed()
+        self.solved = True
+        self.stats.add_steps(0, time.perf_counter() - start)
 
     def cell_in_use(self, cell):
-        return cell in self.__visited or cell == self.__current_cell
+        return super().cell_in_use(cell) or cell == self.__current_cell
 
     def get_path(self):
         pass
 
-    def get_cells_in_use(self):
-        return []
-
 
 class BinaryTree(Solver):
     def __init__(self, name, grid: CellGrid):
@@ -720,45 +1970,68 @@ class BinaryTree(Solver):
         self.__current_cell = None
         self.__dirs = [(1, -1), (1, 1), (-1, 1), (-1, -1)] # NE, SE, SW, NW
         self.__cd_idx = 0 # Current index in __dirs
-        self.__visited = []
 
     def reset(self, grid):
         self._grid = grid
+        self._reset_states()
         self._grid.set_cell_type_forall(CellType.WALL)
-        self.__current_cell = self._grid.get_cell(1, 1)
+        self.__current_cell = None
         self.solved = False
 
-    def show(self, surface):
+    def get_volatile_overlay(self):
         if self.__current_cell:
-            self.__current_cell.show(surface, (0, 250, 50))
+            return [((0, 250, 50), [self.__current_cell])]
+        return []
 
     def solve_step(self):
         if self.solved:
             return
 
-        nx = self.__current_cell.x + 2
-        ny = self.__current_cell.y
-        if nx > self._grid.size - 2:
+        if self.__current_cell is None:
+            nx, ny = 1, 1
+        else:
+            nx = self.__current_cell.x + 2
+            ny = self.__current_cell.y
+        if nx > self._grid.width - 2:
             nx = 1
             ny += 2
-        if ny > self._grid.size - 2:
-            logger.info("Generated maze with %s!", self.name)
-            self.__current_cell = None
-            self.solved = True
+        if ny > self._grid.height - 2:
+            self.__finish()
             return
-            
+
         c = self._grid.get_cell(nx, ny)
+        c.type = CellType.FLOOR
 
+        # Join to room in horizontal or vertical direction by carving wall between
         dirs = [(self.__dirs[self.__cd_idx][0], 0), (0, self.__dirs[self.__cd_idx][1])]
-        cells = [self._grid.get_cell(nx + x[0], ny + x[1]) for x in dirs if self._grid.in_bounds(nx + x[0], ny + x[1], 1)]
+        cells = [self._grid.get_cell(nx + x[0], ny + x[1]) for x in dirs if self._grid.in_bounds(nx + 2 * x[0], ny + 2 * x[1], 1)]
 
         if len(cells) > 0:
             rc = cells[random.randint(0, len(cells) - 1)]
             rc.type = CellType.FLOOR
-            get_cell_in_between(self._grid, rc, c).type = CellType.FLOOR
 
         self.__current_cell = c
 
+    # Generate whole maze at once with array operations if no steps were taken yet
+    # Random generator is seeded from random module so seeding that repeats mazes.
+    def solve_all(self):
+        if self.solved:
+            return
+        if self.__current_cell is not None:
+            super().solve_all()
+            return
+        start = time.perf_counter()
+        rng = np.random.default_rng(random.getrandbits(64))
+        self._grid.set_types(bulk_maze.binary_tree(self._grid.width, self._grid.height, self.__dirs[self.__cd_idx], rng))
+        self._touch_all()
+        self.__finish()
+        self.stats.add_steps(0, time.perf_counter() - start)
+
+    def __finish(self):
+        logger.info("Generated maze with %s!", self.name)
+        self.__current_cell = None
+        self.solved = True
+
     def cell_in_use(self, cell):
         return cell == self.__current_cell
 
@@ -770,13 +2043,96 @@ class BinaryTree(Solver):
     def get_path(self):
         pass
 
-    def get_cells_in_use(self):
+class Sidewinder(Solver):
+    def __init__(self, name, grid: CellGrid):
+        super().__init__(name, grid)
+        self.__current_cell = None
+        self.__run_start = 1 # x of first room in current run
+
+    def reset(self, grid):
+        self._grid = grid
+        self._reset_states()
+        self._grid.set_cell_type_forall(CellType.WALL)
+        self.__current_cell = None
+        self.__run_start = 1
+        self.solved = False
+
+    def get_volatile_overlay(self):
+        if self.__current_cell:
+            return [((0, 250, 50), [self.__current_cell])]
         return []
 
+    # Rooms are visited row by row, each room either continues the run east or
+    # ends it and joins a random room of the run to the row above.
+    # First row has no row above and is a single run.
+    def solve_step(self):
+        if self.solved:
+            return
+
+        if self.__current_cell is None:
+            nx, ny = 1, 1
+        else:
+            nx = self.__current_cell.x + 2
+            ny = self.__current_cell.y
+        if nx > self._grid.width - 2:
+            nx = 1
+            ny += 2
+            self.__run_start = 1
+        if ny > self._grid.height - 2:
+            self.__finish()
+            return
+
+        c = self._grid.get_cell(nx, ny)
+        c.type = CellType.FLOOR
+
+        last = nx + 2 > self._grid.width - 2
+        if ny == 1 or not (last or random.randint(0, 1)):
+            if not last:
+                self._grid.get_cell(nx + 1, ny).type = CellType.FLOOR
+        else:
+            rx = self.__run_start + 2 * random.randint(0, (nx - self.__run_start) // 2)
+            self._grid.get_cell(rx, ny - 1).type = CellType.FLOOR
+            self.__run_start = nx + 2
+
+        self.__current_cell = c
+
+    # Generate whole maze at once with array operations if no steps were taken yet
+    def solve_all(self):
+        if self.solved:
+            return
+        if self.__current_cell is not None:
+            super().solve_all()
+            return
+        start = time.perf_counter()
+        rng = np.random.default_rng(random.getrandbits(64))
+        self._grid.set_types(bulk_maze.sidewinder(self._grid.width, self._grid.height, rng))
+        self._touch_all()
+        self.__finish()
+        self.stats.add_steps(0, time.perf_counter() - start)
+
+    def __finish(self):
+        logger.info("Generated maze with %s!", self.name)
+        self.__current_cell = None
+        self.solved = True
+
+    def cell_in_use(self, cell):
+        return cell == self.__current_cell
+
+    def get_path(self):
+        pass
+
 PATHFINDERS = [
     'Astar',
     'Dijkstra',
-    'DFS'
+    'DFS',
+    'JPS',
+    'BiAstar',
+    'BiDijkstra',
+    'LPAstar',
+    'HPAstar',
+    'FlowField',
+    'DialAstar',
+    'Dial'
 ]
 
 SOLVERS = {
@@ -784,11 +2140,20 @@ SOLVERS = {
     'Astar': Astar,
     'Dijkstra': Dijkstra,
     'DFS': DFS,
+    'JPS': JumpPointSearch,
+    'BiAstar': BiAstar,
+    'BiDijkstra': BiDijkstra,
+    'LPAstar': LPAstar,
+    'HPAstar': HPAstar,
+    'FlowField': FlowFieldSolver,
+    'DialAstar': DialAstar,
+    'Dial': Dial,
 
     # Maze generators
     'Prim': PrimGenerator,
     'BackTrack': BackTrackGenerator,
     'DivideAndConquer': DNQGenerator,
     'HuntAndKill': HuntAndKill,
-    'BinaryTree': BinaryTree
+    'BinaryTree': BinaryTree,
+    'Sidewinder': Sidewinder
 }
\ No newline at end of file
@@ -0,0 +1,62 @@
+import json
+import sys
+from pathlib import Path
+import logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+STATS_DIRECTORY = Path(__file__).parent.parent / 'stats'
+
+
+# Peak resident memory of the process in bytes, None if the platform doesn't tell
+def peak_memory():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Work counters of one solver run
+# Solvers count expanded cells and relaxed edges in their hot loops with plain
+# attribute increments, queue counters are taken from the queues when stats are read
+# with Solver.get_stats. Steps and step time are added by whoever runs the steps.
+# Counters a solver doesn't keep stay 0.
+class SolverStats:
+    __slots__ = ('expanded', 'relaxed', 'pushes', 'pops', 'peak_frontier', 'steps', 'step_time', 'peak_memory')
+
+    def __init__(self):
+        self.expanded = 0  # Cells or nodes taken out of the frontier
+        self.relaxed = 0  # Edges looked at from expanded cells
+        self.pushes = 0  # Queue pushes, decrease-key included
+        self.pops = 0
+        self.peak_frontier = 0  # Largest queue size
+        self.steps = 0
+        self.step_time = 0.0  # Seconds spent in steps
+        self.peak_memory = None  # Bytes, process high-water mark when stats were read
+
+    def add_steps(self, steps, seconds):
+        self.steps += steps
+        self.step_time += seconds
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "SolverStats(%s)" % ', '.join('%s=%s' % item for item in self.as_dict().items())
+
+
+# Write stats of a run as json, file name is picked from solver name and time if not given
+def save_stats(run, file_path=None):
+    if file_path is None:
+        STATS_DIRECTORY.mkdir(exist_ok=True)
+        file_path = STATS_DIRECTORY / ('%s_%s.json' % (run['solver'], run['time'].replace(':', '-')))
+    with open(file_path, 'w') as f:
+        json.dump(run, f, indent=2)
+    logger.info("Wrote solver stats to %s", file_path)
+    return file_path
@@ -0,0 +1,70 @@
+import time
+import logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+# Share of a 60 FPS frame given to solver steps, rest is left for events and rendering
+DEFAULT_BUDGET = 0.008
+
+# Weight of newest measurement in moving average of step time
+STEP_TIME_SMOOTHING = 0.2
+
+# Clock is read after every CLOCK_CHECKS:th part of planned steps
+CLOCK_CHECKS = 16
+
+
+# Runs solver steps for one frame within a time budget
+# Speed is the number of steps wanted per frame. Steps that would not fit in the
+# budget by the measured average step time are left for later frames, so a frame
+# never runs much over budget however high speed is set. Speed 1 is one step per
+# frame like before.
+#
+#   scheduler = StepScheduler()
+#   scheduler.speed = 1000
+#   steps = scheduler.run(solver)  # once per frame
+class StepScheduler:
+    def __init__(self, budget=DEFAULT_BUDGET, speed=1):
+        self.budget = budget  # Seconds per frame
+        self.speed = speed
+        self.step_time = None  # Moving average of seconds per step, None until measured
+        self.last_steps = 0  # Steps run on last frame
+
+    # Steps planned for next frame
+    def planned_steps(self):
+        if self.step_time is None:
+            return 1
+        return max(1, min(self.speed, int(self.budget / self.step_time)))
+
+    # Run planned steps of solver, stops early when solved or budget runs out
+    # Returns number of steps run
+    def run(self, solver):
+        if solver.solved or solver.no_path:
+            self.last_steps = 0
+            return 0
+        limit = self.planned_steps()
+        check = max(1, limit // CLOCK_CHECKS)
+        solve_step = solver.solve_step
+        start = time.perf_counter()
+        deadline = start + self.budget
+        steps = 0
+        while steps < limit and not solver.solved and not solver.no_path:
+            solve_step()
+            steps += 1
+            if steps % check == 0 and time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - start
+        self.__measure(elapsed / steps)
+        solver.stats.add_steps(steps, elapsed)
+        self.last_steps = steps
+        return steps
+
+    def __measure(self, step_time):
+        if self.step_time is None:
+            self.step_time = step_time
+        else:
+            self.step_time += (step_time - self.step_time) * STEP_TIME_SMOOTHING
+
+    # Forget measured step time, steps of a new solver can cost anything
+    def reset(self):
+        self.step_time = None
+        self.last_steps = 0
@@ -0,0 +1,67 @@
+import random
+
+from cell_grid import CellGrid, CellType
+import solver as slvr
+
+
+# 64x64 grid with random walls, start in cluster (0, 0) and end in diagonal cluster (1, 1)
+def diagonal_clusters_grid(seed):
+    rng = random.Random(seed)
+    grid = CellGrid(64, 1)
+    for _ in range(64 * 64 // 4):
+        grid.set_cell_type(rng.randrange(1, 63), rng.randrange(1, 63), CellType.WALL)
+    grid.set_cell_type(1, 1, CellType.START)
+    grid.set_cell_type(16, 28, CellType.END)
+    return grid
+
+
+def solve(grid):
+    solver = slvr.SOLVERS['HPAstar']('HPAstar', grid)
+    solver.reset(grid)
+    solver.solve_all()
+    return solver
+
+
+# Direct start to end edge is refined through the off-diagonal clusters, cells there are in use
+def test_cells_of_direct_edge_are_in_use():
+    for seed in range(20):
+        solver = solve(diagonal_clusters_grid(seed))
+        if solver.solved:
+            assert all(solver.cell_in_use(c) for c in solver.get_path()), seed
+
+
+# Wall drawn on refined path restarts search and new path goes around it
+def test_wall_on_refined_path_restarts_search():
+    grid = diagonal_clusters_grid(0)
+    solver = solve(grid)
+    assert solver.solved
+    off_diagonal = [c for c in solver.get_path() if (c.x // slvr.CLUSTER_SIZE, c.y // slvr.CLUSTER_SIZE) in ((0, 1), (1, 0))]
+    assert off_diagonal
+    cell = off_diagonal[len(off_diagonal) // 2]
+    grid.set_cell_type(cell.x, cell.y, CellType.WALL)
+    assert solver.cell_edited(grid.get_cell(cell.x, cell.y))
+    solver.solve_all()
+    assert solver.solved
+    assert (cell.x, cell.y) not in [(c.x, c.y) for c in solver.get_path()]
+
+
+# Edits made while the solver wasn't told, like in Edit mode, are picked up on reset
+def test_reset_syncs_edits_and_replaced_types():
+    grid = diagonal_clusters_grid(0)
+    solver = solve(grid)
+    cell = solver.get_path()[len(solver.get_path()) // 2]
+    grid.set_cell_type(cell.x, cell.y, CellType.WALL)
+    solver.reset(grid)
+    solver.solve_all()
+    assert solver.solved
+    assert (cell.x, cell.y) not in [(c.x, c.y) for c in solver.get_path()]
+
+    # Wall across the grid replaces all types, end can't be reached
+    types = bytearray(grid._types)
+    for x in range(1, 63):
+        types[32 * 64 + x] = CellType.WALL.value
+    grid.set_types(types)
+    grid.set_cell_type(60, 60, CellType.END)
+    solver.reset(grid)
+    solver.solve_all()
+    assert solver.no_path
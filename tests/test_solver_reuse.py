@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from cell_grid import CellGrid, CellType
+import solver as slvr
+
+
+# Reused solver clears only cells of its last run, results match a fresh solver on a copy
+@pytest.mark.parametrize('name', ['Astar', 'Dijkstra', 'Dial', 'DialAstar'])
+def test_reused_solver_matches_fresh(name):
+    rng = random.Random(7)
+    grid = CellGrid(60, 1, height=45)
+    for _ in range(700):
+        grid.set_cell_type(rng.randrange(1, 59), rng.randrange(1, 44), CellType.WALL)
+    for _ in range(300):
+        grid.set_cost(rng.randrange(60), rng.randrange(45), rng.randint(1, 9))
+    reused = slvr.SOLVERS[name](name, grid)
+    for q in range(60):
+        grid.set_cell_type(rng.randrange(1, 59), rng.randrange(1, 44), CellType.START)
+        grid.set_cell_type(rng.randrange(1, 59), rng.randrange(1, 44), CellType.END)
+        # Search values still hold the last run, so only its cells are cleared
+        assert q == 0 or grid._search_owner is reused
+        reused.reset(grid)
+        if q % 7 == 2:
+            # Interrupted run
+            for _ in range(rng.randrange(50)):
+                reused.solve_step()
+            reused.reset(grid)
+        reused.solve_all()
+        copy = grid.copy()
+        fresh = slvr.SOLVERS[name](name, copy)
+        fresh.reset(copy)
+        fresh.solve_all()
+        assert reused.solved == fresh.solved
+        assert bytes(reused.states) == bytes(fresh.states)
+        if fresh.solved:
+            assert [(c.x, c.y) for c in reused.get_path()] == [(c.x, c.y) for c in fresh.get_path()]